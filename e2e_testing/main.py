@@ -69,6 +69,18 @@ Regular expression specifying which tests to include in this run.
                         help="""Run tests sequentially rather than in parallel.
 This can be useful for debugging, since it runs the tests in the same process,
 which make it easier to attach a debugger or get a stack trace.""")
+    parser.add_argument("--roundtrip_bytecode",
+                        default=False,
+                        action="store_true",
+                        help="""Save each compiled module as MLIR bytecode and load it
+back before handing it to the backend. Only applies to the "linalg", "tosa"
+and "stablehlo" configs.""")
+    parser.add_argument("--refbackend_opt_level",
+                        type=int,
+                        choices=[0, 1, 2],
+                        default=0,
+                        help="""How much RefBackend optimizes the generated code. Only
+applies to the "linalg" and "torchdynamo" configs.""")
     parser.add_argument("--crashing_tests_to_not_attempt_to_run_and_a_bug_is_filed",
                         metavar="TEST", type=str, nargs="+",
                         help="A set of tests to not attempt to run, since they crash and cannot be XFAILed.")
@@ -82,15 +94,17 @@ def main():
 
     # Find the selected config.
     if args.config == "linalg":
-        config = LinalgOnTensorsBackendTestConfig(RefBackendLinalgOnTensorsBackend())
+        config = LinalgOnTensorsBackendTestConfig(
+            RefBackendLinalgOnTensorsBackend(opt_level=args.refbackend_opt_level),
+            args.roundtrip_bytecode)
         xfail_set = LINALG_XFAIL_SET
         crashing_set = set()
     elif args.config == "tosa":
-        config = TosaBackendTestConfig(LinalgOnTensorsTosaBackend())
+        config = TosaBackendTestConfig(LinalgOnTensorsTosaBackend(), args.roundtrip_bytecode)
         xfail_set = all_test_unique_names - TOSA_PASS_SET
         crashing_set = set()
     elif args.config == "stablehlo":
-        config = StablehloBackendTestConfig(LinalgOnTensorsStablehloBackend())
+        config = StablehloBackendTestConfig(LinalgOnTensorsStablehloBackend(), args.roundtrip_bytecode)
         xfail_set = all_test_unique_names - STABLEHLO_PASS_SET
         crashing_set = set()
     elif args.config == "native_torch":
@@ -106,7 +120,8 @@ def main():
         xfail_set = LTC_XFAIL_SET
         crashing_set = set()
     elif args.config == "torchdynamo":
-        config = TorchDynamoTestConfig(RefBackendLinalgOnTensorsBackend())
+        config = TorchDynamoTestConfig(
+            RefBackendLinalgOnTensorsBackend(opt_level=args.refbackend_opt_level))
         xfail_set = TORCHDYNAMO_XFAIL_SET
         crashing_set = TORCHDYNAMO_CRASHING_SET
 
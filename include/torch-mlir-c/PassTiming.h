@@ -0,0 +1,55 @@
+/*===-- torch-mlir-c/PassTiming.h - Pass timing instrumentation ---*- C -*-===*\
+|*                                                                            *|
+|* Part of the LLVM Project, under the Apache License v2.0 with LLVM          *|
+|* Exceptions.                                                                *|
+|* See https://llvm.org/LICENSE.txt for license information.                  *|
+|* SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception                    *|
+|*                                                                            *|
+\*===----------------------------------------------------------------------===*/
+
+#ifndef TORCHMLIR_C_PASSTIMING_H
+#define TORCHMLIR_C_PASSTIMING_H
+
+#include "mlir-c/Pass.h"
+#include "mlir-c/Support.h"
+
+#include <stdint.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/** Records when each pass run by a pass manager starts and how long it
+ * takes. The timer is owned by the pass manager it was added to.
+ */
+typedef struct TorchMlirPassTimer {
+  void *ptr;
+} TorchMlirPassTimer;
+
+/** Adds a pass timer to `passManager`. The timer records every pass that
+ * runs as part of the pass manager's pipeline, including passes of dynamic
+ * pipelines, without otherwise changing how the pipeline runs.
+ */
+MLIR_CAPI_EXPORTED TorchMlirPassTimer
+torchMlirPassManagerAddPassTimer(MlirPassManager passManager);
+
+/** Returns the number of pass runs recorded by `timer`. */
+MLIR_CAPI_EXPORTED intptr_t
+torchMlirPassTimerGetNumInvocations(TorchMlirPassTimer timer);
+
+/** Gets the `pos`-th pass run recorded by `timer`.
+ * The name is the pass argument, prefixed with the names of the ops it is
+ * nested under, e.g. `func.func/canonicalize`. It stays valid as long as the
+ * timer. Times are in seconds, and `start` is relative to when the timer was
+ * added.
+ */
+MLIR_CAPI_EXPORTED void
+torchMlirPassTimerGetInvocation(TorchMlirPassTimer timer, intptr_t pos,
+                                MlirStringRef *name, double *start,
+                                double *duration, uint64_t *threadId);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif // TORCHMLIR_C_PASSTIMING_H
@@ -32,6 +32,8 @@ std::unique_ptr<OperationPass<ModuleOp>> createMLProgramBufferizePass();
 std::unique_ptr<OperationPass<func::FuncOp>> createMungeMemrefCopyPass();
 
 std::unique_ptr<OperationPass<func::FuncOp>> createGeneralizeTensorPadPass();
+
+std::unique_ptr<OperationPass<ModuleOp>> createExternalizeConstantsPass();
 } // namespace RefBackend
 } // namespace torch
 } // namespace mlir
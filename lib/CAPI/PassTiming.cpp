@@ -0,0 +1,119 @@
+//===- PassTiming.cpp - C API for pass timing -----------------------------===//
+//
+// Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+// See https://llvm.org/LICENSE.txt for license information.
+// SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+//
+//===----------------------------------------------------------------------===//
+
+#include "torch-mlir-c/PassTiming.h"
+
+#include "mlir/CAPI/Pass.h"
+#include "mlir/CAPI/Support.h"
+#include "mlir/Pass/PassInstrumentation.h"
+#include "mlir/Pass/PassManager.h"
+#include "llvm/ADT/DenseMap.h"
+#include "llvm/ADT/STLExtras.h"
+#include "llvm/Support/Threading.h"
+
+#include <chrono>
+#include <deque>
+#include <mutex>
+
+using namespace mlir;
+
+namespace {
+struct PassInvocation {
+  std::string name;
+  double start;
+  double duration;
+  uint64_t threadId;
+};
+
+/// Records every pass run. Passes on different ops can run concurrently, so
+/// the bookkeeping is guarded by a mutex.
+class PassTimer : public PassInstrumentation {
+public:
+  using Clock = std::chrono::steady_clock;
+
+  PassTimer() : origin(Clock::now()) {}
+
+  void runBeforePass(Pass *pass, Operation *op) override {
+    // Pass adaptors, which run the nested pipelines on each op, have no
+    // argument. Their time is covered by the passes they run.
+    if (pass->getArgument().empty())
+      return;
+    std::lock_guard<std::mutex> lock(mutex);
+    starts[{pass, op}] = Clock::now();
+  }
+
+  void runAfterPass(Pass *pass, Operation *op) override { record(pass, op); }
+
+  void runAfterPassFailed(Pass *pass, Operation *op) override {
+    record(pass, op);
+  }
+
+  std::deque<PassInvocation> invocations;
+
+private:
+  void record(Pass *pass, Operation *op) {
+    if (pass->getArgument().empty())
+      return;
+    Clock::time_point end = Clock::now();
+    std::lock_guard<std::mutex> lock(mutex);
+    auto it = starts.find({pass, op});
+    if (it == starts.end())
+      return;
+    Clock::time_point start = it->second;
+    starts.erase(it);
+    invocations.push_back(
+        {getName(pass, op),
+         std::chrono::duration<double>(start - origin).count(),
+         std::chrono::duration<double>(end - start).count(),
+         llvm::get_threadid()});
+  }
+
+  /// Prefixes the pass argument with the names of the ops the pass is nested
+  /// under, leaving out the op the pipeline runs on.
+  static std::string getName(Pass *pass, Operation *op) {
+    SmallVector<StringRef> anchors;
+    for (Operation *parent = op; parent->getParentOp();
+         parent = parent->getParentOp())
+      anchors.push_back(parent->getName().getStringRef());
+    std::string name;
+    for (StringRef anchor : llvm::reverse(anchors))
+      name += (anchor + "/").str();
+    return name + pass->getArgument().str();
+  }
+
+  Clock::time_point origin;
+  std::mutex mutex;
+  llvm::DenseMap<std::pair<Pass *, Operation *>, Clock::time_point> starts;
+};
+} // namespace
+
+static PassTimer *unwrap(TorchMlirPassTimer timer) {
+  return static_cast<PassTimer *>(timer.ptr);
+}
+
+TorchMlirPassTimer
+torchMlirPassManagerAddPassTimer(MlirPassManager passManager) {
+  auto timer = std::make_unique<PassTimer>();
+  TorchMlirPassTimer result = {timer.get()};
+  unwrap(passManager)->addInstrumentation(std::move(timer));
+  return result;
+}
+
+intptr_t torchMlirPassTimerGetNumInvocations(TorchMlirPassTimer timer) {
+  return static_cast<intptr_t>(unwrap(timer)->invocations.size());
+}
+
+void torchMlirPassTimerGetInvocation(TorchMlirPassTimer timer, intptr_t pos,
+                                     MlirStringRef *name, double *start,
+                                     double *duration, uint64_t *threadId) {
+  const PassInvocation &invocation = unwrap(timer)->invocations[pos];
+  *name = wrap(StringRef(invocation.name));
+  *start = invocation.start;
+  *duration = invocation.duration;
+  *threadId = invocation.threadId;
+}
@@ -22,6 +22,7 @@
 
 #ifdef TORCH_MLIR_ENABLE_STABLEHLO
 #include "mhlo/transforms/passes.h"
+#include "stablehlo/dialect/Register.h"
 #endif
 
 void mlir::torch::registerAllDialects(mlir::DialectRegistry &registry) {
@@ -29,6 +30,12 @@ void mlir::torch::registerAllDialects(mlir::DialectRegistry &registry) {
   registry.insert<mlir::torch::Torch::TorchDialect>();
   registry.insert<mlir::torch::TorchConversion::TorchConversionDialect>();
   registry.insert<mlir::torch::TMTensor::TMTensorDialect>();
+
+#ifdef TORCH_MLIR_ENABLE_STABLEHLO
+  // Modules lowered to StableHLO may be serialized and parsed back into a new
+  // context, which requires these dialects to be registered up front.
+  mlir::stablehlo::registerAllDialects(registry);
+#endif
 }
 
 void mlir::torch::registerAllPasses() {
@@ -29,6 +29,7 @@
 #include "torch-mlir/Dialect/TorchConversion/IR/TorchConversionOps.h"
 #include "torch-mlir/Dialect/TorchConversion/Transforms/BackendTypeConversion.h"
 #include "torch-mlir/RefBackend/Passes.h"
+#include "llvm/ADT/MapVector.h"
 #include <numeric>
 #include <set>
 
@@ -54,13 +55,15 @@ void mlir::torch::RefBackend::registerRefBackendPasses() { ::registerPasses(); }
 static bool isArgMemRefTypeValid(Type type) {
   if (auto memRefType = type.dyn_cast<MemRefType>()) {
     Type elemTy = memRefType.getElementType();
-    if (elemTy.isa<Float16Type, Float32Type, Float64Type>()) {
+    if (elemTy.isa<Float16Type, BFloat16Type, Float32Type, Float64Type>()) {
       return true;
     } else if (auto integerTy = elemTy.dyn_cast<IntegerType>()) {
       if (integerTy.isSignlessInteger(64))
         return true;
       if (integerTy.isSignlessInteger(32))
         return true;
+      if (integerTy.isSignlessInteger(16))
+        return true;
       if (integerTy.isSignlessInteger(8))
         return true;
       if (integerTy.isSignedInteger(8))
@@ -86,6 +89,9 @@ static Type getAbiTypeForMemRef(Type type) {
 // mri32 etc. The strings from multiple return values are concatenated to get
 // the consumeFuncReturnFunc name.
 static std::string getTypeToken(Type type) {
+  // Distinguish bf16 from f16, which have the same bit width.
+  if (type.isBF16())
+    return "bf16";
   if (type.isSignlessInteger())
     return ("i" + Twine(type.getIntOrFloatBitWidth())).str();
   else if (type.isa<mlir::FloatType>())
@@ -148,8 +154,8 @@ static LogicalResult mungeFunction(
     auto type = arg.getType();
     if (!isArgMemRefTypeValid(type)) {
       return emitError(arg.getLoc())
-          .append("argument must be a memref of f32, f64, i32, i64, i8, i1, "
-                  "c32, c64, but "
+          .append("argument must be a memref of f16, bf16, f32, f64, i64, i32, "
+                  "i16, i8, i1, c32, c64, but "
                   "got ",
                   type);
     }
@@ -459,3 +465,86 @@ std::unique_ptr<OperationPass<func::FuncOp>>
 mlir::torch::RefBackend::createGeneralizeTensorPadPass() {
   return std::make_unique<GeneralizeTensorPad>();
 }
+
+//===----------------------------------------------------------------------===//
+// ExternalizeConstants
+//===----------------------------------------------------------------------===//
+
+// Only element types that the invoker can pass in as numpy arrays without
+// conversion are externalized.
+static bool isExternalizableElementType(Type type) {
+  if (type.isa<Float16Type, Float32Type, Float64Type>())
+    return true;
+  return type.isSignlessInteger(8) || type.isSignlessInteger(32) ||
+         type.isSignlessInteger(64);
+}
+
+// Gets a DenseElementsAttr holding the value of the constant `op`, or a null
+// attribute if the constant should stay in the module.
+static DenseElementsAttr getExternalizableValue(arith::ConstantOp op,
+                                                int64_t minElements) {
+  auto type = op.getType().dyn_cast<RankedTensorType>();
+  if (!type || !type.hasStaticShape() || type.getNumElements() < minElements ||
+      !isExternalizableElementType(type.getElementType()))
+    return nullptr;
+  if (auto elements = op.getValue().dyn_cast<DenseElementsAttr>())
+    return elements.isSplat() ? nullptr : elements;
+  if (auto elements = op.getValue().dyn_cast<DenseResourceElementsAttr>()) {
+    AsmResourceBlob *blob = elements.getRawHandle().getBlob();
+    if (!blob)
+      return nullptr;
+    return DenseElementsAttr::getFromRawBuffer(type, blob->getData());
+  }
+  return nullptr;
+}
+
+namespace {
+class ExternalizeConstants
+    : public ExternalizeConstantsBase<ExternalizeConstants> {
+  void runOnOperation() override {
+    auto module = getOperation();
+    for (auto func : module.getOps<func::FuncOp>()) {
+      // Only the arguments of functions callable from outside of the module
+      // can be supplied by the invoker.
+      if (func.isPrivate() || func.isExternal())
+        continue;
+
+      // Constants are uniqued by value, so identical constants share one
+      // argument.
+      llvm::MapVector<Attribute, SmallVector<arith::ConstantOp>> constants;
+      SmallVector<Attribute> values;
+      func.walk([&](arith::ConstantOp op) {
+        DenseElementsAttr value = getExternalizableValue(op, minElements);
+        if (!value)
+          return;
+        auto it = constants.find(op.getValue());
+        if (it == constants.end()) {
+          values.push_back(value);
+          it = constants.insert({op.getValue(), {}}).first;
+        }
+        it->second.push_back(op);
+      });
+      if (constants.empty())
+        continue;
+
+      for (auto &p : constants) {
+        Type type = p.second.front().getType();
+        unsigned index = func.getNumArguments();
+        func.insertArgument(index, type, /*argAttrs=*/{}, func.getLoc());
+        BlockArgument arg = func.getArgument(index);
+        for (arith::ConstantOp op : p.second) {
+          op.getResult().replaceAllUsesWith(arg);
+          op.erase();
+        }
+      }
+      func->setAttr("refback.external_constants",
+                    ArrayAttr::get(func.getContext(), values));
+    }
+  }
+};
+} // namespace
+
+std::unique_ptr<OperationPass<ModuleOp>>
+mlir::torch::RefBackend::createExternalizeConstantsPass() {
+  return std::make_unique<ExternalizeConstants>();
+}
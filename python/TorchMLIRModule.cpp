@@ -9,6 +9,7 @@
 
 #include "mlir/Bindings/Python/PybindAdaptors.h"
 #include "torch-mlir-c/Dialects.h"
+#include "torch-mlir-c/PassTiming.h"
 #include "torch-mlir-c/Registration.h"
 
 namespace py = pybind11;
@@ -28,4 +29,41 @@ PYBIND11_MODULE(_torchMlir, m) {
         }
       },
       py::arg("context"), py::arg("load") = true);
+
+  m.def(
+      "register_all_dialects",
+      [](MlirContext context) { torchMlirRegisterAllDialects(context); },
+      py::arg("context"),
+      "Registers and loads all dialects that torch-mlir can produce.");
+
+  py::class_<TorchMlirPassTimer>(m, "PassTimer",
+                                 "Records the passes run by a PassManager.")
+      .def(
+          "get_invocations",
+          [](TorchMlirPassTimer timer) {
+            py::list invocations;
+            intptr_t numInvocations =
+                torchMlirPassTimerGetNumInvocations(timer);
+            for (intptr_t i = 0; i < numInvocations; ++i) {
+              MlirStringRef name;
+              double start, duration;
+              uint64_t threadId;
+              torchMlirPassTimerGetInvocation(timer, i, &name, &start,
+                                              &duration, &threadId);
+              invocations.append(py::make_tuple(
+                  py::str(name.data, name.length), start, duration, threadId));
+            }
+            return invocations;
+          },
+          "Returns a `(name, start, duration, thread_id)` tuple for each "
+          "pass run so far, with times in seconds.");
+
+  m.def(
+      "add_pass_timer",
+      [](MlirPassManager passManager) {
+        return torchMlirPassManagerAddPassTimer(passManager);
+      },
+      py::arg("pass_manager"), py::keep_alive<0, 1>(),
+      "Adds a PassTimer to a PassManager, which then records every pass it "
+      "runs.");
 }
@@ -0,0 +1,39 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import torch
+
+import torch_mlir
+
+class TanhModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+    def forward(self, x):
+        return torch.ops.aten.tanh(x)
+
+tanh_example_input = torch.ones(2, 3)
+
+module = torch_mlir.acquire(TanhModule(), tanh_example_input)
+print(module)
+# CHECK-LABEL: @forward
+# CHECK: torch.aten.tanh %{{.*}} : !torch.vtensor<[2,3],f32> -> !torch.vtensor<[2,3],f32>
+
+# The same acquired module can be lowered to several backends.
+print(torch_mlir.lower(module, "tosa"))
+# CHECK-LABEL: @forward
+# CHECK: tosa.tanh
+print(torch_mlir.lower(module, torch_mlir.OutputType.LINALG_ON_TENSORS))
+# CHECK-LABEL: @forward
+# CHECK: linalg.generic
+print(torch_mlir.lower(module, "stablehlo"))
+# CHECK-LABEL: @forward
+# CHECK: stablehlo.tanh
+
+# Lowering leaves the acquired module untouched.
+print(module)
+# CHECK-LABEL: @forward
+# CHECK: torch.aten.tanh
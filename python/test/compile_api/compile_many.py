@@ -0,0 +1,41 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import torch
+
+import torch_mlir
+
+class TanhModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+    def forward(self, x):
+        return torch.ops.aten.tanh(x)
+
+modules, timings = torch_mlir.compile_many(
+    TanhModule(),
+    [torch.ones(1, 3), torch_mlir.TensorPlaceholder([8, -1], torch.float32)])
+for module in modules:
+    print(module)
+# CHECK-LABEL: @forward
+# CHECK: torch.aten.tanh %{{.*}} : !torch.vtensor<[1,3],f32> -> !torch.vtensor<[1,3],f32>
+# CHECK-LABEL: @forward
+# CHECK: torch.aten.tanh %{{.*}} : !torch.vtensor<[8,?],f32> -> !torch.vtensor<[8,?],f32>
+
+# The model is only scripted for the first set of example args.
+print([sorted(timing.keys()) for timing in timings])
+# CHECK-NEXT: [['import', 'lower', 'script'], ['import', 'lower', 'script']]
+print(timings[0]["script"] > 0.0, timings[1]["script"] < timings[0]["script"])
+# CHECK-NEXT: True True
+
+modules, _ = torch_mlir.compile_many(
+    TanhModule(), [torch.ones(2, 3), torch.ones(4, 3)], output_type="tosa")
+for module in modules:
+    print(module)
+# CHECK-LABEL: @forward
+# CHECK: tosa.tanh %{{.*}} : (tensor<2x3xf32>) -> tensor<2x3xf32>
+# CHECK-LABEL: @forward
+# CHECK: tosa.tanh %{{.*}} : (tensor<4x3xf32>) -> tensor<4x3xf32>
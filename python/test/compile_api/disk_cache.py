@@ -0,0 +1,64 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import os
+import tempfile
+
+import torch
+
+import torch_mlir
+
+class LinearModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = torch.nn.Linear(3, 4)
+    def forward(self, x):
+        return self.linear(x)
+
+def num_entries(cache):
+    return len([f for f in os.listdir(cache.cache_dir) if f.endswith(".mlirbc")])
+
+example_input = torch.ones(2, 3)
+
+with tempfile.TemporaryDirectory() as cache_dir:
+    cache = torch_mlir.DiskCompileCache(cache_dir)
+    model = LinearModule()
+    first = torch_mlir.compile(model, example_input, "linalg-on-tensors", cache=cache)
+    print(num_entries(cache))
+    # CHECK: 1
+
+    # Compiling the same model again is a cache hit producing the same module.
+    second = torch_mlir.compile(model, example_input, "linalg-on-tensors", cache=cache)
+    print(num_entries(cache))
+    # CHECK-NEXT: 1
+    print(str(first) == str(second))
+    # CHECK-NEXT: True
+
+    # Different weights, shapes or output types are cache misses.
+    torch_mlir.compile(LinearModule(), example_input, "linalg-on-tensors", cache=cache)
+    torch_mlir.compile(model, torch.ones(5, 3), "linalg-on-tensors", cache=cache)
+    torch_mlir.compile(model, example_input, "tosa", cache=cache)
+    print(num_entries(cache))
+    # CHECK-NEXT: 4
+
+    # Corrupt entries are treated as misses and rewritten.
+    for f in os.listdir(cache_dir):
+        if f.endswith(".mlirbc"):
+            with open(os.path.join(cache_dir, f), "wb") as corrupt:
+                corrupt.write(b"\x00garbage")
+    hits, misses = cache.hits, cache.misses
+    third = torch_mlir.compile(model, example_input, "linalg-on-tensors", cache=cache)
+    print(cache.hits - hits, cache.misses - misses, str(first) == str(third))
+    # CHECK-NEXT: 0 1 True
+    print(num_entries(cache))
+    # CHECK-NEXT: 4
+
+    # Entries are evicted until the cache fits within its size limit.
+    cache.max_size_bytes = 1
+    torch_mlir.compile(model, example_input, "torch", cache=cache)
+    print(num_entries(cache))
+    # CHECK-NEXT: 0
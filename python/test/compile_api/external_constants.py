@@ -0,0 +1,42 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import os
+import tempfile
+
+import torch
+
+import torch_mlir
+from torch_mlir_e2e_test.linalg_on_tensors_backends.refbackend import RefBackendLinalgOnTensorsBackend
+
+class LinearModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = torch.nn.Linear(32, 64)
+    def forward(self, x):
+        return self.linear(x)
+
+model = LinearModule()
+example_input = torch.ones(2, 32)
+
+with tempfile.TemporaryDirectory() as parameters_dir:
+    backend = RefBackendLinalgOnTensorsBackend(parameters_dir=parameters_dir)
+    module = torch_mlir.compile(model, example_input, output_type="linalg-on-tensors")
+    compiled = backend.compile(module)
+    # Only the weight is large enough to be externalized; the bias stays.
+    print(len(os.listdir(parameters_dir)))
+    # CHECK: 1
+
+    # Compiling for another batch size reuses the stored weight.
+    module = torch_mlir.compile(model, torch.ones(4, 32), output_type="linalg-on-tensors")
+    backend.compile(module)
+    print(len(os.listdir(parameters_dir)))
+    # CHECK-NEXT: 1
+
+    result = backend.load(compiled).forward(example_input.numpy())
+    print(torch.allclose(torch.from_numpy(result), model(example_input), atol=1e-6))
+    # CHECK-NEXT: True
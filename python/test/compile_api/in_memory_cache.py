@@ -0,0 +1,67 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import torch
+
+import torch_mlir
+
+class TanhModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+    def forward(self, x):
+        return torch.ops.aten.tanh(x)
+
+cache = torch_mlir.InMemoryCompileCache(max_entries=2)
+for batch_size in [1, 1, 8, 8]:
+    torch_mlir.compile(TanhModule(), torch.ones(batch_size, 3), cache=cache)
+print(cache.hits, cache.misses, cache.evictions)
+# CHECK: 2 2 0
+
+# Modules returned on a hit are copies, so mutating them does not affect
+# later hits.
+module = torch_mlir.compile(TanhModule(), torch.ones(1, 3), cache=cache)
+del module.operation.attributes["torch.debug_module_name"]
+module = torch_mlir.compile(TanhModule(), torch.ones(1, 3), cache=cache)
+print("torch.debug_module_name" in module.operation.attributes)
+# CHECK-NEXT: True
+
+# Storing a third entry evicts the least recently used one.
+torch_mlir.compile(TanhModule(), torch.ones(4, 3), cache=cache)
+print(cache.hits, cache.misses, cache.evictions)
+# CHECK-NEXT: 4 3 1
+
+# Weights are hashed again only after they are modified.
+class LinearModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = torch.nn.Linear(3, 3)
+    def forward(self, x):
+        return self.linear(x)
+
+cache = torch_mlir.InMemoryCompileCache()
+model = LinearModule()
+torch_mlir.compile(model, torch.ones(1, 3), cache=cache)
+torch_mlir.compile(model, torch.ones(1, 3), cache=cache)
+with torch.no_grad():
+    model.linear.weight.add_(1)
+torch_mlir.compile(model, torch.ones(1, 3), cache=cache)
+print(cache.hits, cache.misses)
+# CHECK-NEXT: 1 2
+
+# With a precomputed key, a hit does not script the model at all.
+torch_mlir.compile(model, torch.ones(1, 3), cache=cache, cache_key="linear-v1")
+module = torch_mlir.compile(None, torch.ones(1, 3), cache=cache,
+                            cache_key="linear-v1")
+print(cache.hits, cache.misses, module is not None)
+# CHECK-NEXT: 2 3 True
+
+try:
+    torch_mlir.compile(None, torch.ones(2, 3), cache=cache,
+                       cache_key="linear-v1")
+except Exception as e:
+    print(e)
+# CHECK-NEXT: `model` must be specified unless it is found in `cache` under `cache_key`
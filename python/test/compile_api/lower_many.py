@@ -0,0 +1,37 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import concurrent.futures
+
+import torch
+
+import torch_mlir
+
+class TanhModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+    def forward(self, x):
+        return torch.ops.aten.tanh(x)
+
+module = torch_mlir.acquire(TanhModule(), torch.ones(2, 3))
+
+modules, times = torch_mlir.lower_many(module, ["tosa", "linalg-on-tensors"])
+print(sorted(t.value for t in times))
+# CHECK: ['linalg-on-tensors', 'tosa']
+print(modules[torch_mlir.OutputType.TOSA])
+# CHECK-LABEL: @forward
+# CHECK: tosa.tanh
+print(modules[torch_mlir.OutputType.LINALG_ON_TENSORS])
+# CHECK-LABEL: @forward
+# CHECK: linalg.generic
+
+# The caller can provide the executor as well.
+with concurrent.futures.ThreadPoolExecutor() as executor:
+    modules, _ = torch_mlir.lower_many(module, ["stablehlo"], executor=executor)
+print(modules[torch_mlir.OutputType.STABLEHLO])
+# CHECK-LABEL: @forward
+# CHECK: stablehlo.tanh
@@ -0,0 +1,53 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import json
+import os
+import tempfile
+
+import torch
+
+import torch_mlir
+from torch_mlir.compiler_utils import run_pipeline_with_repro_report
+
+class TanhModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+    def forward(self, x):
+        return torch.ops.aten.tanh(x)
+
+module = torch_mlir.compile(TanhModule(), torch.ones(2, 3), output_type="torch")
+timing = run_pipeline_with_repro_report(
+    module,
+    "builtin.module(func.func(canonicalize),torch-backend-to-linalg-on-tensors-backend-pipeline)",
+    "Lowering Torch Backend IR -> Linalg-on-Tensors Backend IR",
+    enable_timing=True)
+names = [t.name for t in timing.passes]
+print("func.func/canonicalize" in names)
+# CHECK: True
+print("func.func/convert-torch-to-linalg" in names)
+# CHECK-NEXT: True
+print(all(t.invocation_count >= 1 for t in timing.passes))
+# CHECK-NEXT: True
+print(timing.total_time > 0)
+# CHECK-NEXT: True
+print(module)
+# CHECK-LABEL: @forward
+# CHECK: linalg.generic
+
+# Timing reports are written when `TORCH_MLIR_PASS_TIMING_DIR` is set.
+with tempfile.TemporaryDirectory() as report_dir:
+    os.environ["TORCH_MLIR_PASS_TIMING_DIR"] = report_dir
+    torch_mlir.compile(TanhModule(), torch.ones(2, 3), output_type="tosa")
+    del os.environ["TORCH_MLIR_PASS_TIMING_DIR"]
+    reports = sorted(os.listdir(report_dir))
+    print(len([r for r in reports if r.endswith(".trace.json")]))
+    # CHECK-NEXT: 2
+    summary = [r for r in reports if not r.endswith(".trace.json")][0]
+    with open(os.path.join(report_dir, summary)) as f:
+        print(sorted(json.load(f).keys()))
+    # CHECK-NEXT: ['description', 'passes', 'pipeline', 'total_time']
@@ -0,0 +1,45 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import numpy as np
+import torch
+
+import torch_mlir
+from torch_mlir_e2e_test.linalg_on_tensors_backends.refbackend import RefBackendLinalgOnTensorsBackend, get_lowering_pipeline
+
+class MatmulReluModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+    def forward(self, x, y):
+        return torch.relu(torch.matmul(x, y)), x.sum(dim=1)
+
+print("convert-linalg-to-loops" in get_lowering_pipeline(0))
+# CHECK: True
+print("scf-parallel-loop-tiling" in get_lowering_pipeline(1))
+# CHECK-NEXT: True
+print("async-parallel-for" in get_lowering_pipeline(2))
+# CHECK-NEXT: True
+
+# The optimized pipeline computes the same results as the default one, also
+# for shapes that are not a multiple of the tile size.
+x = torch.randn(70, 40)
+y = torch.randn(40, 50)
+results = []
+for opt_level in [0, 1]:
+    backend = RefBackendLinalgOnTensorsBackend(opt_level=opt_level)
+    module = torch_mlir.compile(MatmulReluModule(), [x, y],
+                                output_type="linalg-on-tensors")
+    results.append(backend.load(backend.compile(module)).forward(x, y))
+print(all(np.allclose(a, b, rtol=1e-5, atol=1e-5)
+          for a, b in zip(results[0], results[1])))
+# CHECK-NEXT: True
+
+try:
+    RefBackendLinalgOnTensorsBackend(opt_level=3)
+except Exception as e:
+    print(e)
+# CHECK-NEXT: Unsupported RefBackend opt_level: 3
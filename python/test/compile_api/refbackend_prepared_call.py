@@ -0,0 +1,41 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import numpy as np
+import torch
+
+import torch_mlir
+from torch_mlir_e2e_test.linalg_on_tensors_backends.refbackend import RefBackendLinalgOnTensorsBackend
+
+class AddModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+    def forward(self, x, y):
+        return x + y, x.sum()
+
+backend = RefBackendLinalgOnTensorsBackend()
+module = torch_mlir.compile(AddModule(), [torch.ones(3, 4), torch.ones(3, 4)],
+                            output_type="linalg-on-tensors")
+loaded = backend.load(backend.compile(module))
+
+# Prepared functions are looked up once and reused by attribute access.
+forward = loaded.prepare("forward")
+print(forward is loaded.forward)
+# CHECK: True
+
+# The argument descriptors are reused across calls. Non-contiguous arrays
+# are copied into contiguous buffers, which the compiled code expects.
+x = np.arange(12, dtype=np.float32).reshape(3, 4)
+result, total = forward(x, np.ones((3, 4), np.float32))
+print(result[2].tolist(), total)
+# CHECK-NEXT: [9.0, 10.0, 11.0, 12.0] 66.0
+result, total = forward(x, np.arange(12, dtype=np.float32).reshape(4, 3).T)
+print(result[0].tolist(), result[2].tolist(), total)
+# CHECK-NEXT: [0.0, 4.0, 8.0, 12.0] [10.0, 14.0, 18.0, 22.0] 66.0
+
+print(hasattr(loaded, "no_such_function"))
+# CHECK-NEXT: False
@@ -0,0 +1,48 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import gc
+
+import numpy as np
+import torch
+
+import torch_mlir
+from torch_mlir_e2e_test.linalg_on_tensors_backends.refbackend import RefBackendLinalgOnTensorsBackend
+
+class Module(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+    def forward(self, x):
+        return torch.tanh(x), x * 2
+
+backend = RefBackendLinalgOnTensorsBackend()
+module = torch_mlir.compile(Module(), torch.ones(2, 3),
+                            output_type="linalg-on-tensors")
+loaded = backend.load(backend.compile(module))
+
+x = np.zeros((2, 3), np.float32)
+results = loaded.forward(x)
+# Multiple results are returned as a tuple, like the module returns them.
+print(type(results).__name__, len(results))
+# CHECK: tuple 2
+tanh, doubled = results
+# Results own their buffers.
+print(np.shares_memory(tanh, x), np.shares_memory(tanh, doubled))
+# CHECK-NEXT: False False
+
+# Results stay valid after later invocations and collections.
+for i in range(10):
+    loaded.forward(np.full((2, 3), i, np.float32))
+gc.collect()
+print(tanh.tolist(), doubled.tolist())
+# CHECK-NEXT: {{\[}}[0.0, 0.0, 0.0], [0.0, 0.0, 0.0]] {{\[}}[0.0, 0.0, 0.0], [0.0, 0.0, 0.0]]
+
+# Results can be handed over as torch tensors without copying.
+forward = loaded.prepare("forward", return_torch_tensors=True)
+tanh, doubled = forward(np.ones((2, 3), np.float32))
+print(type(tanh).__name__, doubled.tolist())
+# CHECK-NEXT: Tensor {{\[}}[2.0, 2.0, 2.0], [2.0, 2.0, 2.0]]
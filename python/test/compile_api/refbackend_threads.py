@@ -0,0 +1,39 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import concurrent.futures
+
+import numpy as np
+import torch
+
+import torch_mlir
+from torch_mlir_e2e_test.linalg_on_tensors_backends.refbackend import RefBackendLinalgOnTensorsBackend
+
+class MatmulModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+    def forward(self, x, y):
+        return torch.matmul(x, y)
+
+backend = RefBackendLinalgOnTensorsBackend()
+module = torch_mlir.compile(MatmulModule(),
+                            [torch.ones(16, 16), torch.ones(16, 16)],
+                            output_type="linalg-on-tensors")
+loaded = backend.load(backend.compile(module))
+
+# Many threads share one loaded module, and each gets its own results.
+def invoke(i):
+    x = np.full((16, 16), i, dtype=np.float32)
+    y = np.eye(16, dtype=np.float32)
+    for _ in range(50):
+        if not (loaded.forward(x, y) == x).all():
+            return False
+    return True
+
+with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+    print(all(executor.map(invoke, range(64))))
+# CHECK: True
@@ -0,0 +1,66 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import torch
+
+import torch_mlir
+from torch_mlir_e2e_test.linalg_on_tensors_backends.refbackend import RefBackendLinalgOnTensorsBackend
+
+class AddModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+    def forward(self, x, y):
+        return x + y
+
+class CloneModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+    def forward(self, x):
+        return torch.ops.aten.clone(x)
+
+def load(model, example_args):
+    backend = RefBackendLinalgOnTensorsBackend()
+    module = torch_mlir.compile(model, example_args,
+                                output_type="linalg-on-tensors")
+    return backend.load(backend.compile(module))
+
+# Torch tensors are passed directly, including dtypes that numpy supports
+# but the invoker used not to. Non-contiguous tensors are copied first.
+x = torch.arange(6, dtype=torch.int16).reshape(2, 3)
+y = torch.arange(6, dtype=torch.int16).reshape(3, 2).t()
+loaded = load(AddModule(), [x, y])
+print(loaded.forward(x, y).tolist())
+# CHECK: {{\[}}[0, 3, 6], [4, 7, 10]]
+
+# Tensors on other devices are rejected, even after a CPU tensor of the same
+# rank and dtype was passed.
+try:
+    loaded.forward(x, y.to("meta"))
+except AssertionError as e:
+    print(e)
+# CHECK-NEXT: Only CPU tensors are supported, but got a tensor on meta
+
+# numpy cannot represent bfloat16, so results of that dtype come back as
+# torch tensors.
+x = torch.tensor([1.5, -2.0, 3.25], dtype=torch.bfloat16)
+result = load(CloneModule(), [x]).forward(x)
+print(result.dtype, result.tolist())
+# CHECK-NEXT: torch.bfloat16 [1.5, -2.0, 3.25]
+
+# Any object supporting the DLPack protocol works as an argument.
+class DLPackBuffer:
+    def __init__(self, tensor):
+        self.tensor = tensor
+    def __dlpack__(self, stream=None):
+        return self.tensor.__dlpack__()
+    def __dlpack_device__(self):
+        return self.tensor.__dlpack_device__()
+
+x = torch.ones(2, 3)
+loaded = load(AddModule(), [x, x])
+print(loaded.forward(DLPackBuffer(x), DLPackBuffer(x * 2)).tolist())
+# CHECK-NEXT: {{\[}}[3.0, 3.0, 3.0], [3.0, 3.0, 3.0]]
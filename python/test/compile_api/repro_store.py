@@ -0,0 +1,53 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import gzip
+import os
+import tempfile
+
+import torch
+
+import torch_mlir
+from torch_mlir.compiler_utils import (
+    ReproStore,
+    TorchMlirCompilerError,
+    run_pipeline_with_repro_report,
+    set_repro_store,
+)
+
+class TanhModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+    def forward(self, x):
+        return torch.ops.aten.tanh(x)
+
+with tempfile.TemporaryDirectory() as repro_dir:
+    set_repro_store(ReproStore(repro_dir, compress_threshold_bytes=1))
+    module = torch_mlir.compile(TanhModule(), torch.ones(2, 3), output_type="torch")
+    for _ in range(2):
+        try:
+            run_pipeline_with_repro_report(
+                module, "builtin.module(not-a-real-pass)", "Failing pipeline")
+        except TorchMlirCompilerError as e:
+            print(e)
+    # CHECK: Failing pipeline failed with the following diagnostics:
+    # CHECK: $ gunzip -c {{.*}}/TanhModule-{{.*}}.mlir.gz | torch-mlir-opt -pass-pipeline='builtin.module(not-a-real-pass)' -
+    # CHECK: Failing pipeline failed with the following diagnostics:
+
+    # Every failure gets its own repro.
+    repros = sorted(os.listdir(repro_dir))
+    print(len(repros))
+    # CHECK-NEXT: 2
+    with gzip.open(os.path.join(repro_dir, repros[0]), "rt") as f:
+        print(f.read())
+    # CHECK: func.func @forward
+
+    # Old repros are evicted once the directory exceeds its size limit.
+    ReproStore(repro_dir, max_total_bytes=1).write("Small", "module {}")
+    print(os.listdir(repro_dir)[0].startswith("Small-"), len(os.listdir(repro_dir)))
+    # CHECK-NEXT: True 1
+    set_repro_store(None)
@@ -0,0 +1,36 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import os
+import tempfile
+
+import torch
+
+import torch_mlir
+
+class LinearModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.linear = torch.nn.Linear(3, 4)
+    def forward(self, x):
+        return self.linear(x)
+
+module = torch_mlir.compile(LinearModule(), torch.ones(2, 3), output_type="linalg-on-tensors")
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    path = os.path.join(tmp_dir, "linear.mlirbc")
+    torch_mlir.save_module(module, path)
+    # Bytecode files start with the magic number "ML\xefR".
+    with open(path, "rb") as f:
+        print(f.read(4) == b"ML\xefR")
+    # CHECK: True
+    loaded = torch_mlir.load_module(path)
+    print(str(loaded) == str(module))
+    # CHECK-NEXT: True
+    print(loaded)
+    # CHECK-LABEL: @forward
+    # CHECK: linalg.matmul
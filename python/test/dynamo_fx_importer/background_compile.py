@@ -0,0 +1,76 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+import threading
+from typing import List
+
+import torch
+import torch.fx
+import torch._dynamo as dynamo
+
+from torch_mlir.dynamo import BackgroundCompiler, make_simple_dynamo_backend
+
+compile_may_finish = threading.Event()
+
+
+def slow_backend(gm: torch.fx.GraphModule,
+                 example_inputs: List[torch.Tensor]):
+    compile_may_finish.wait()
+
+    def compiled_callable(*inputs):
+        print("compiled")
+        return gm(*inputs)
+    return compiled_callable
+
+
+compiler = BackgroundCompiler()
+
+
+@dynamo.optimize(make_simple_dynamo_backend(slow_backend,
+                                            background_compiler=compiler))
+def f(x):
+    return torch.tanh(x)
+
+
+# While the graph is compiling, calls run it eagerly.
+print(f(torch.zeros(3)))
+# CHECK: tensor([0., 0., 0.])
+print(compiler.pending_compiles, compiler.fallback_calls,
+      compiler.fallback_seconds > 0)
+# CHECK-NEXT: 1 1 True
+
+# Once the compile is done, calls switch over to the compiled callable.
+compile_may_finish.set()
+print(compiler.wait(timeout=60))
+# CHECK-NEXT: True
+print(f(torch.zeros(3)))
+# CHECK-NEXT: compiled
+# CHECK-NEXT: tensor([0., 0., 0.])
+print(compiler.pending_compiles, compiler.completed_compiles,
+      compiler.fallback_calls)
+# CHECK-NEXT: 0 1 1
+
+
+def failing_backend(gm: torch.fx.GraphModule,
+                    example_inputs: List[torch.Tensor]):
+    raise Exception("unsupported graph")
+
+
+# Graphs that fail to compile keep running eagerly.
+@dynamo.optimize(make_simple_dynamo_backend(failing_backend,
+                                            background_compiler=compiler))
+def g(x):
+    return torch.sin(x)
+
+
+g(torch.zeros(3))
+compiler.wait(timeout=60)
+print(g(torch.zeros(3)))
+# CHECK-NEXT: tensor([0., 0., 0.])
+print(compiler.failed_compiles, compiler.fallback_calls)
+# CHECK-NEXT: 1 3
+compiler.shutdown()
@@ -52,10 +52,10 @@ basic(torch.randn(3, 4))
 # CHECK:           %[[INT4:.*]] = torch.constant.int 4
 # CHECK:           %[[LIST:.*]] = torch.prim.ListConstruct %[[INT3]], %[[INT4]] : (!torch.int, !torch.int) -> !torch.list<int>
 # CHECK:           %[[INT5:.*]] = torch.constant.int 5
-# CHECK:           %[[NONE0:.*]] = torch.constant.none
+# CHECK:           %[[NONE:.*]] = torch.constant.none
 # CHECK:           %[[DEVICE_CPU:.*]] = torch.constant.device "cpu"
-# CHECK:           %[[NONE1:.*]] = torch.constant.none
-# CHECK:           %[[RANDN:.*]] = torch.aten.randn %[[LIST]], %[[INT5]], %[[NONE0]], %[[DEVICE_CPU]], %[[NONE1]] : !torch.list<int>, !torch.int, !torch.none, !torch.Device, !torch.none -> !torch.vtensor<[3,4],f16>
+# CHECK-NOT:       torch.constant.none
+# CHECK:           %[[RANDN:.*]] = torch.aten.randn %[[LIST]], %[[INT5]], %[[NONE]], %[[DEVICE_CPU]], %[[NONE]] : !torch.list<int>, !torch.int, !torch.none, !torch.Device, !torch.none -> !torch.vtensor<[3,4],f16>
 # CHECK:           return %[[RANDN]] : !torch.vtensor<[3,4],f16>
 @dynamo.optimize(my_backend)
 def literals_list_device_int_none_dtype():
@@ -70,12 +70,10 @@ literals_list_device_int_none_dtype()
 
 # CHECK-LABEL:   func.func @literals_bool(
 # CHECK-SAME:                                %[[ARG0:.*]]: !torch.vtensor<[3,4],f32> loc(unknown)) -> !torch.vtensor<[3,4],f32> {
-# CHECK:           %[[NONE0:.*]] = torch.constant.none
-# CHECK:           %[[NONE1:.*]] = torch.constant.none
-# CHECK:           %[[NONE2:.*]] = torch.constant.none
+# CHECK:           %[[NONE:.*]] = torch.constant.none
 # CHECK:           %[[BOOL_FALSE:.*]] = torch.constant.bool false
-# CHECK:           %[[NONE3:.*]] = torch.constant.none
-# CHECK:           %[[EMPTY_LIKE:.*]] = torch.aten.empty_like %[[ARG0]], %[[NONE0]], %[[NONE1]], %[[NONE2]], %[[BOOL_FALSE]], %[[NONE3]] : !torch.vtensor<[3,4],f32>, !torch.none, !torch.none, !torch.none, !torch.bool, !torch.none -> !torch.vtensor<[3,4],f32>
+# CHECK-NOT:       torch.constant.none
+# CHECK:           %[[EMPTY_LIKE:.*]] = torch.aten.empty_like %[[ARG0]], %[[NONE]], %[[NONE]], %[[NONE]], %[[BOOL_FALSE]], %[[NONE]] : !torch.vtensor<[3,4],f32>, !torch.none, !torch.none, !torch.none, !torch.bool, !torch.none -> !torch.vtensor<[3,4],f32>
 # CHECK:           return %[[EMPTY_LIKE]] : !torch.vtensor<[3,4],f32>
 @dynamo.optimize(my_backend)
 def literals_bool(x):
@@ -114,3 +112,57 @@ def literals_str(x):
 
 set_model_name("literals_str")
 literals_str(torch.randn(3, 4))
+
+
+# Literals are imported as constants at the start of the function, once per
+# distinct value.
+# CHECK-LABEL:   func.func @literals_interned(
+# CHECK-SAME:                                %[[ARG0:.*]]: !torch.vtensor<[3,4],f32> loc(unknown)) -> !torch.vtensor<[3,4],f32> {
+# CHECK:           %[[FLOAT0:.*]] = torch.constant.float 0.000000e+00
+# CHECK:           %[[FLOAT1:.*]] = torch.constant.float 1.000000e+00
+# CHECK:           %[[NONE:.*]] = torch.constant.none
+# CHECK:           %[[FLOAT_NEG0:.*]] = torch.constant.float -0.000000e+00
+# CHECK-NOT:       torch.constant
+# CHECK:           %[[UNIFORM0:.*]] = torch.aten.uniform %[[ARG0]], %[[FLOAT0]], %[[FLOAT1]], %[[NONE]]
+# CHECK:           %[[UNIFORM1:.*]] = torch.aten.uniform %[[UNIFORM0]], %[[FLOAT_NEG0]], %[[FLOAT1]], %[[NONE]]
+# CHECK:           %[[UNIFORM2:.*]] = torch.aten.uniform %[[UNIFORM1]], %[[FLOAT0]], %[[FLOAT1]], %[[NONE]]
+# CHECK:           return %[[UNIFORM2]] : !torch.vtensor<[3,4],f32>
+@dynamo.optimize(my_backend)
+def literals_interned(x):
+    x = torch.ops.aten.uniform(x, 0.0, 1.0)
+    x = torch.ops.aten.uniform(x, -0.0, 1.0)
+    return torch.ops.aten.uniform(x, 0.0, 1.0)
+
+
+set_model_name("literals_interned")
+literals_interned(torch.randn(3, 4))
+
+
+# Sizes that Dynamo traces as symbolic are imported as unknown sizes.
+# CHECK-LABEL:   func.func @dynamic_shapes(
+# CHECK-SAME:        !torch.vtensor<[?,?],f32>
+# CHECK:           %[[TANH:.*]] = torch.aten.tanh {{.*}} : !torch.vtensor<[?,?],f32> -> !torch.vtensor<[?,?],f32>
+# CHECK:           return %[[TANH]] : !torch.vtensor<[?,?],f32>
+@dynamo.optimize(my_backend, dynamic=True)
+def dynamic_shapes(x):
+    return torch.tanh(x)
+
+
+set_model_name("dynamic_shapes")
+dynamic_shapes(torch.randn(3, 4))
+
+
+# The result types of the function are those of the returned values.
+# CHECK-LABEL:   func.func @multiple_results(
+# CHECK-SAME:        %[[ARG0:.*]]: !torch.vtensor<[3,4],f32> loc(unknown)) -> (!torch.vtensor<[3],f32>, !torch.vtensor<[3],si64>, !torch.vtensor<[3,4],f32>) {
+# CHECK:           %[[MAX:.*]]:2 = torch.aten.max.dim %[[ARG0]]
+# CHECK:           %[[TANH:.*]] = torch.aten.tanh %[[ARG0]]
+# CHECK:           return %[[MAX]]#0, %[[MAX]]#1, %[[TANH]] : !torch.vtensor<[3],f32>, !torch.vtensor<[3],si64>, !torch.vtensor<[3,4],f32>
+@dynamo.optimize(my_backend)
+def multiple_results(x):
+    values, indices = torch.ops.aten.max.dim(x, 1)
+    return values, indices, torch.tanh(x)
+
+
+set_model_name("multiple_results")
+multiple_results(torch.randn(3, 4))
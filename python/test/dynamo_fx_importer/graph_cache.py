@@ -0,0 +1,100 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# RUN: %PYTHON %s | FileCheck %s
+
+from typing import List
+
+import torch
+import torch.fx
+import torch._dynamo as dynamo
+
+import torch_mlir
+from torch_mlir.dynamo import make_simple_dynamo_backend
+from torch_mlir_e2e_test.configs.torchdynamo import jit
+
+num_compiles = 0
+
+
+def counting_backend(gm: torch.fx.GraphModule,
+                     example_inputs: List[torch.Tensor]):
+    global num_compiles
+    num_compiles += 1
+    return gm
+
+
+reusing_backend = make_simple_dynamo_backend(counting_backend,
+                                             reuse_compiled_graphs=True)
+
+
+# Two functions with the same body produce structurally identical graphs, so
+# the second one reuses the callable compiled for the first one.
+@dynamo.optimize(reusing_backend)
+def f(x, y):
+    return torch.tanh(x) + y
+
+
+@dynamo.optimize(reusing_backend)
+def g(a, b):
+    return torch.tanh(a) + b
+
+
+print(f(torch.ones(3), torch.ones(3)))
+# CHECK: tensor([1.7616, 1.7616, 1.7616])
+print(g(torch.zeros(3), torch.ones(3)))
+# CHECK-NEXT: tensor([1., 1., 1.])
+print(num_compiles)
+# CHECK-NEXT: 1
+
+# Different shapes, dtypes or strides are compiled separately.
+g(torch.ones(4), torch.ones(4))
+g(torch.ones(4, dtype=torch.float64), torch.ones(4, dtype=torch.float64))
+print(num_compiles)
+# CHECK-NEXT: 3
+g(torch.ones(4, 4), torch.ones(4, 4))
+g(torch.ones(4, 4).t(), torch.ones(4, 4))
+print(num_compiles)
+# CHECK-NEXT: 5
+
+
+# Only the most recently used graphs are kept.
+bounded_backend = make_simple_dynamo_backend(counting_backend,
+                                             reuse_compiled_graphs=True,
+                                             max_compiled_graphs=1)
+
+
+@dynamo.optimize(bounded_backend)
+def h1(x):
+    return torch.sin(x)
+
+
+@dynamo.optimize(bounded_backend)
+def h2(x):
+    return torch.sin(x)
+
+
+# Dynamo caches compiled code per function, so these are separate functions.
+num_compiles = 0
+h1(torch.ones(5))
+h2(torch.ones(6))
+h2(torch.ones(5))
+print(num_compiles)
+# CHECK-NEXT: 3
+
+
+# `jit` looks the lowered module up in its cache before importing the graph.
+class TanhModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+    def forward(self, x):
+        return torch.tanh(x)
+
+
+cache = torch_mlir.InMemoryCompileCache()
+for batch_size in [1, 1, 8]:
+    module = jit(TanhModule(), [torch.ones(batch_size, 3)],
+                 "linalg-on-tensors", cache=cache)
+print(cache.hits, cache.misses)
+# CHECK-NEXT: 1 2
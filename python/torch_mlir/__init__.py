@@ -6,15 +6,32 @@
 from typing import Optional, Sequence, Union, List, Dict, Tuple, Callable, Iterable
 from enum import Enum
 
-import sys
-from io import StringIO
+import concurrent.futures
+import os
 import tempfile
+import time
 
 from torch._functorch.compile_utils import strip_overloads
 import torch
 import torch.fx
 
-from .compiler_utils import run_pipeline_with_repro_report
+from .compiler_utils import (
+    run_pipeline_with_repro_report,
+    capture_stderr,
+    clone_module,
+    deserialize_module,
+    serialize_module,
+    save_module,
+    load_module,
+)
+from .compile_cache import (
+    CompileCache,
+    DiskCompileCache,
+    InMemoryCompileCache,
+    compute_cache_key,
+    compute_extra_library_cache_key,
+    compute_lowering_cache_key,
+)
 from torch_mlir.dialects.torch.importer.jit_ir import ClassAnnotator, ImportOptions, ModuleBuilder
 from torch_mlir.dialects.torch.importer.jit_ir.build_tools.library_generator import generate_library
 
@@ -249,21 +266,56 @@ BACKEND_LEGAL_OPS = {
 
 
 def _canon_extra_library(extra_library):
+    """Gets the path of a file holding `extra_library` as MLIR.
+
+    The file is named after a hash of the source of the library functions,
+    so it is only generated once for a given library, and concurrent compiles
+    with different libraries never clobber each other's files.
+    """
     extra_library_file_name = ""
     if len(extra_library) != 0:
+        extra_library_dir = os.path.join(tempfile.gettempdir(),
+                                         "torch_mlir_extra_library")
+        extra_library_file_name = os.path.join(
+            extra_library_dir,
+            compute_extra_library_cache_key(extra_library) + ".mlir")
+        if os.path.exists(extra_library_file_name):
+            return extra_library_file_name
+
         extra_library_dict = {}
         for library_func in extra_library:
             extra_library_dict[library_func.__name__] = library_func
         mlir_library = generate_library(extra_library_dict)
 
-        extra_library_file_name = \
-            tempfile.gettempdir() + "/custom_op_extra_library.mlir"
-        with open(extra_library_file_name, "w") as f:
+        # Write the library atomically, since another process might be
+        # generating the same file concurrently.
+        os.makedirs(extra_library_dir, exist_ok=True)
+        fd, tmp_file_name = tempfile.mkstemp(dir=extra_library_dir,
+                                             suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
             f.write(mlir_library)
+        os.replace(tmp_file_name, extra_library_file_name)
     return extra_library_file_name
 
 
-def _lower_mlir_module(verbose, output_type, module):
+def _lower_mlir_module(verbose, output_type, module, cache=None):
+    """Lowers a module satisfying the Torch backend contract to `output_type`.
+
+    If `cache` is specified, the lowered module is looked up in it before
+    running the backend lowering pipeline, and stored in it afterwards.
+    """
+    if cache is None or output_type == OutputType.TORCH:
+        return _run_backend_lowering(verbose, output_type, module)
+    cache_key = compute_lowering_cache_key(module, output_type.value)
+    cached_module = cache.get(cache_key)
+    if cached_module is not None:
+        return cached_module
+    module = _run_backend_lowering(verbose, output_type, module)
+    cache.put(cache_key, module)
+    return module
+
+
+def _run_backend_lowering(verbose, output_type, module):
     if verbose:
         print("\n====================")
         print("Torch Backend IR")
@@ -306,6 +358,115 @@ def _lower_mlir_module(verbose, output_type, module):
     raise Exception(f"Unknown OutputType: {output_type}")
 
 
+def _get_scripted_model(model: torch.nn.Module,
+                        example_args: "ExampleArgs",
+                        use_tracing: bool,
+                        ignore_traced_shapes: bool) -> torch.jit.ScriptModule:
+    """Gets `model` as JIT IR (TorchScript) for import."""
+    # For FX-based models, automatically strip overloads.
+    if isinstance(model, torch.fx.GraphModule):
+        strip_overloads(model)
+
+    if isinstance(model, torch.jit.ScriptModule):
+        # If the user already converted the model to JIT IR themselves, just
+        # do some basic error checking, but take the model as-is.
+        for method_name in example_args._get_methods():
+            if not hasattr(model, method_name):
+                raise Exception(
+                    f"Model does not have exported method '{method_name}', "
+                    f"requested in `example_args`. Consider adding "
+                    f"`@torch.jit.export` to the method definition.")
+        return model
+    if use_tracing:
+        return torch.jit.trace_module(
+            model,
+            example_args._get_for_tracing(use_tracing, ignore_traced_shapes)
+        )
+    # Make sure that all the methods that the user requested get scripted.
+    # By default, PyTorch only scripts the `forward` method and transitive
+    # callees.
+    for method_name in example_args._get_methods():
+        torch.jit.export(getattr(model, method_name).__func__)
+    return torch.jit.script(model)
+
+
+def _create_class_annotator(scripted: torch.jit.ScriptModule,
+                            method_names: Iterable[str]) -> ClassAnnotator:
+    """Creates a ClassAnnotator that exports `method_names` of `scripted`."""
+    class_annotator = ClassAnnotator()
+    class_annotator.exportNone(scripted._c._type())
+    for method_name in method_names:
+        class_annotator.exportPath(scripted._c._type(), [method_name])
+    return class_annotator
+
+
+def _import_scripted_model(scripted: torch.jit.ScriptModule,
+                           annotations: Dict[str, List[TensorPlaceholder]],
+                           ignore_traced_shapes: bool,
+                           class_annotator: Optional[ClassAnnotator] = None):
+    """Imports `scripted` as torch-mlir Object Graph IR.
+
+    `class_annotator` can be reused across imports of the same `scripted`
+    model. It must export the methods in `annotations`, see
+    `_create_class_annotator`, and its arg annotations are replaced.
+    """
+    if class_annotator is None:
+        class_annotator = _create_class_annotator(scripted,
+                                                  annotations.keys())
+    for method_name, example_args in annotations.items():
+        annotation = [None]  # `None` is always the annotation for "self".
+        for arg in example_args:
+            annotation.append((arg.shape, arg.dtype, True))
+        class_annotator.annotateArgs(
+            scripted._c._type(), [method_name], annotation)
+
+    mb = ModuleBuilder()
+    import_options = ImportOptions()
+    import_options.ignoreExistingTensorShapesAndDtypes = ignore_traced_shapes
+    with capture_stderr() as stderr:
+        try:
+            # Import the TorchScript module to MLIR
+            mb.import_module(scripted._c, class_annotator, import_options)
+        except Exception as e:
+            raise Exception(f"""
+PyTorch TorchScript module -> torch-mlir Object Graph IR import failed with:
+### Importer C++ Exception:
+{e}
+### Importer Diagnostics:
+{stderr.getvalue()}
+""") from None
+    return mb.module
+
+
+def _lower_to_backend_contract(module, backend_legal_ops: List[str],
+                               extra_library_file_name: str):
+    """Lowers imported Object Graph IR to the Torch backend contract."""
+    option_string = "{backend-legal-ops=" + ",".join(backend_legal_ops) + \
+        " extra-library=" + extra_library_file_name + "}"
+    run_pipeline_with_repro_report(
+        module,
+        f"builtin.module(torchscript-module-to-torch-backend-pipeline{option_string})",
+        "Lowering TorchScript IR -> Torch Backend IR",
+    )
+
+
+def _get_backend_legal_ops(output_type: OutputType,
+                           backend_legal_ops: Optional[Sequence[str]]
+                           ) -> List[str]:
+    """Gets the backend legal ops to use when compiling to `output_type`."""
+    # We only allow `backend_legal_ops` to be specified for the `"torch"`
+    # output type because the other output types actually invoke their
+    # respective backends (Linalg, TOSA, or STABLEHLO), and those backends have
+    # very specific requirements about the ops which are legal.
+    # See `BACKEND_LEGAL_OPS` for more details.
+    if backend_legal_ops is not None:
+        if output_type != OutputType.TORCH:
+            raise Exception("`backend_legal_ops` is only valid with the "
+                            "`torch` output type")
+        return list(sorted(set(backend_legal_ops)))
+    return BACKEND_LEGAL_OPS.get(output_type, [])
+
+
 def compile(model: torch.nn.Module,
             example_args: _example_args,
             output_type: Union[str, "OutputType"] = OutputType.TORCH,
@@ -313,7 +474,9 @@ def compile(model: torch.nn.Module,
             ignore_traced_shapes=False,
             backend_legal_ops: Optional[Sequence[str]] = None,
             extra_library: Iterable[Callable] = [],
-            verbose: bool = False):
+            verbose: bool = False,
+            cache: Optional[CompileCache] = None,
+            cache_key: Optional[str] = None):
     """Convert a PyTorch model to MLIR.
 
     Args:
@@ -343,102 +506,374 @@ def compile(model: torch.nn.Module,
             `docs/adding_abstract_interpretation_functions.md` for more info
             on the format the functions should have.
         verbose: If true, print extra information about the conversion.
+        cache: If specified, the compiled module is looked up in this cache
+            before importing the model, and stored in it after compiling the
+            model. See `DiskCompileCache` and `InMemoryCompileCache` for more
+            details.
+        cache_key: If specified along with `cache`, a string identifying the
+            code and weights of `model`, such as a checkpoint hash. It is used
+            in place of hashing the model, so that a cache hit does not even
+            script the model. The caller must change the key whenever the
+            model changes.
 
     Returns:
         An MLIR module that contains the converted model in the specified
         output type.
     """
-    extra_library_file_name = _canon_extra_library(extra_library)
+    extra_library = list(extra_library)
     output_type = OutputType.get(output_type)
     example_args = ExampleArgs.get(example_args)
     if ignore_traced_shapes and not use_tracing:
         raise Exception("`ignore_traced_shapes` requires `use_tracing`")
 
-    # We only allow `backend_legal_ops` to be specified for the `"torch"`
-    # output type because the other output types actually invoke their
-    # respective backends (Linalg, TOSA, or STABLEHLO), and those backends have
-    # very specific requirements about the ops which are legal.
-    # See `BACKEND_LEGAL_OPS` for more details.
-    if backend_legal_ops is not None:
-        if output_type != OutputType.TORCH:
-            raise Exception("`backend_legal_ops` is only valid with the "
-                            "`torch` output type")
-        backend_legal_ops = list(sorted(set(backend_legal_ops)))
-    else:
-        backend_legal_ops = BACKEND_LEGAL_OPS.get(output_type, [])
+    backend_legal_ops = _get_backend_legal_ops(output_type, backend_legal_ops)
+
+    # `torch_mlir.compile` is a deliberately simplified API built on top of
+    # the same building blocks as `acquire` and `lower`: an "acquisition"
+    # step that scripts/traces the model, imports it, and lowers it to the
+    # backend contract, followed by a "backend lowering" step.
+    annotations = example_args._get_for_annotation()
+    if cache is not None and cache_key is not None:
+        cache_key = compute_cache_key(None, annotations, output_type.value,
+                                      backend_legal_ops, extra_library,
+                                      ignore_traced_shapes,
+                                      model_key=cache_key,
+                                      use_tracing=use_tracing)
+        cached_module = cache.get(cache_key)
+        if cached_module is not None:
+            return cached_module
+    if model is None:
+        raise Exception("`model` must be specified unless it is found in "
+                        "`cache` under `cache_key`")
+    scripted = _get_scripted_model(model, example_args, use_tracing,
+                                   ignore_traced_shapes)
+    if cache is not None and cache_key is None:
+        cache_key = compute_cache_key(scripted, annotations, output_type.value,
+                                      backend_legal_ops, extra_library,
+                                      ignore_traced_shapes)
+        cached_module = cache.get(cache_key)
+        if cached_module is not None:
+            return cached_module
+
+    module = _import_scripted_model(scripted, annotations,
+                                    ignore_traced_shapes)
+    if output_type != OutputType.RAW:
+        _lower_to_backend_contract(module, backend_legal_ops,
+                                   _canon_extra_library(extra_library))
+        module = _lower_mlir_module(verbose, output_type, module)
+    if cache is not None:
+        cache.put(cache_key, module)
+    return module
+
+
+def acquire(model: torch.nn.Module,
+            example_args: _example_args,
+            use_tracing: bool = False,
+            ignore_traced_shapes=False,
+            backend_legal_ops: Optional[Sequence[str]] = None,
+            extra_library: Iterable[Callable] = [],
+            verbose: bool = False,
+            cache: Optional[CompileCache] = None,
+            cache_key: Optional[str] = None):
+    """Acquire a PyTorch model as MLIR satisfying the Torch backend contract.
+
+    This is the first half of `torch_mlir.compile`. The resulting module can
+    be lowered to any number of backends with `lower`, without scripting and
+    importing the model again:
+    ```python
+    module = torch_mlir.acquire(model, example_args)
+    tosa_module = torch_mlir.lower(module, "tosa")
+    linalg_module = torch_mlir.lower(module, "linalg-on-tensors")
+    ```
 
-    # For FX-based models, automatically strip overloads.
-    if isinstance(model, torch.fx.GraphModule):
-        strip_overloads(model)
+    Args:
+        model: The PyTorch model to convert.
+        example_args: See `torch_mlir.compile`.
+        use_tracing: See `torch_mlir.compile`.
+        ignore_traced_shapes: See `torch_mlir.compile`.
+        backend_legal_ops: A list of ops that should be considered legal for
+            the backends the module will be lowered to. An op that is
+            considered legal will not be decomposed, so it must be supported
+            by every one of those backends. Defaults to no ops, which is
+            supported by all backends.
+        extra_library: See `torch_mlir.compile`.
+        verbose: If true, print extra information about the conversion.
+        cache: See `torch_mlir.compile`.
+        cache_key: See `torch_mlir.compile`.
 
-    # Get the model as JIT IR (TorchScript) for import.
-    # TODO: Longer-term, we probably need to split `torch_mlir.compile`.
-    # There should be an "acquisition" step that does
-    # tracing/scripting/importing from FX/using torchdynamo.export/etc.
-    # + any lowering to the backend contract. Then there should be a
-    # "backend lowering" step that does the actual lowering to each
-    # backend. This separation should be visible at the Python API level, and
-    # we can implement a deliberately simplified API like `torch_mlir.compile`
-    # on top of those building blocks.
-    if isinstance(model, torch.jit.ScriptModule):
-        # If the user already converted the model to JIT IR themselves, just
-        # do some basic error checking, but take the model as-is.
-        for method_name in example_args._get_methods():
-            if not hasattr(model, method_name):
-                raise Exception(
-                    f"Model does not have exported method '{method_name}', "
-                    f"requested in `example_args`. Consider adding "
-                    f"`@torch.jit.export` to the method definition.")
-        scripted = model
-    elif use_tracing:
-        scripted = torch.jit.trace_module(
-            model,
-            example_args._get_for_tracing(use_tracing, ignore_traced_shapes)
-        )
-    else:
-        # Make sure that all the methods that the user requested get scripted.
-        # By default, PyTorch only scripts the `forward` method and transitive
-        # callees.
-        for method_name in example_args._get_methods():
-            torch.jit.export(getattr(model, method_name).__func__)
-        scripted = torch.jit.script(model)
-    class_annotator = ClassAnnotator()
-    class_annotator.exportNone(scripted._c._type())
-    for method_name, example_args in example_args._get_for_annotation().items():
-        class_annotator.exportPath(scripted._c._type(), [method_name])
-        annotation = [None]  # `None` is always the annotation for "self".
-        for arg in example_args:
-            annotation.append((arg.shape, arg.dtype, True))
-        class_annotator.annotateArgs(
-            scripted._c._type(), [method_name], annotation)
+    Returns:
+        An MLIR module in the `torch` output type.
+    """
+    if backend_legal_ops is None:
+        backend_legal_ops = []
+    return compile(model, example_args, OutputType.TORCH, use_tracing,
+                   ignore_traced_shapes, backend_legal_ops, extra_library,
+                   verbose, cache, cache_key)
 
-    mb = ModuleBuilder()
-    import_options = ImportOptions()
-    import_options.ignoreExistingTensorShapesAndDtypes = ignore_traced_shapes
+
+def lower(module,
+          output_type: Union[str, "OutputType"],
+          verbose: bool = False,
+          cache: Optional[CompileCache] = None):
+    """Lower a module satisfying the Torch backend contract to a backend.
+
+    This is the second half of `torch_mlir.compile`, see `acquire`. The
+    module is cloned before lowering, so `module` itself is left untouched
+    and can be lowered again to another output type.
+
+    Args:
+        module: An MLIR module in the `torch` output type, such as the result
+            of `acquire`.
+        output_type: The kind of output to produce. See `OutputType` for more
+            details. `OutputType.RAW` is not allowed.
+        verbose: If true, print extra information about the conversion.
+        cache: If specified, the lowered module is looked up in this cache
+            before lowering, and stored in it afterwards.
+
+    Returns:
+        A new MLIR module in the specified output type.
+    """
+    output_type = OutputType.get(output_type)
+    if output_type == OutputType.RAW:
+        raise Exception("Cannot lower to the `raw` output type")
+    return _lower_mlir_module(verbose, output_type, clone_module(module),
+                              cache)
+
+
+def _lower_module_timed(module, output_type: OutputType, verbose: bool):
+    """Lowers `module` in place for `lower_many` in one of its threads."""
+    start = time.perf_counter()
+    module = _lower_mlir_module(verbose, output_type, module)
+    return module, time.perf_counter() - start
+
+
+def _lower_serialized_module(data: bytes, output_type: OutputType,
+                             verbose: bool) -> Tuple[bytes, float]:
+    """Lowers a module serialized by `lower_many` in one of its workers."""
+    start = time.perf_counter()
+    module = _lower_mlir_module(verbose, output_type, deserialize_module(data))
+    return serialize_module(module), time.perf_counter() - start
+
+
+def lower_many(module,
+               output_types: Iterable[Union[str, "OutputType"]],
+               executor: Optional[concurrent.futures.Executor] = None,
+               max_workers: Optional[int] = None,
+               verbose: bool = False):
+    """Lower a module satisfying the Torch backend contract to many backends.
+
+    The lowering pipelines of the different backends are independent, so they
+    run concurrently, each on its own copy of `module`:
+    ```python
+    module = torch_mlir.acquire(model, example_args)
+    modules, times = torch_mlir.lower_many(
+        module, ["tosa", "linalg-on-tensors", "stablehlo"])
+    ```
+
+    By default, the pipelines run on a thread pool, since the pass manager
+    releases the GIL while it runs. Each thread lowers its own clone of
+    `module`, in the same context. A `concurrent.futures.ProcessPoolExecutor`
+    can be passed as well, in which case the module is shipped to the worker
+    processes as MLIR bytecode. Such a pool should use the "spawn" start
+    method, since forking a process with a live MLIR context can deadlock.
+
+    Args:
+        module: An MLIR module in the `torch` output type, such as the result
+            of `acquire`. It is left untouched.
+        output_types: The kinds of output to produce. See `OutputType` for
+            more details. `OutputType.RAW` is not allowed.
+        executor: The executor to run the lowering pipelines on. Defaults to
+            a new `concurrent.futures.ThreadPoolExecutor`.
+        max_workers: The number of workers of the default executor. Defaults
+            to one worker per output type.
+        verbose: If true, print extra information about the conversion.
+
+    Returns:
+        Two dicts keyed by `OutputType`. The first one holds the lowered
+        modules, which live in the same context as `module`. The second one
+        holds the wall time in seconds spent lowering to each output type.
+    """
+    output_types = [OutputType.get(t) for t in output_types]
+    if OutputType.RAW in output_types:
+        raise Exception("Cannot lower to the `raw` output type")
+    owns_executor = executor is None
+    if owns_executor:
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers or max(len(output_types), 1))
+    # Modules cannot be pickled, so worker processes get them as bytecode.
+    use_processes = isinstance(executor,
+                               concurrent.futures.ProcessPoolExecutor)
     try:
-        original_stderr = sys.stderr
-        sys.stderr = StringIO()
-        # Import the TorchScript module to MLIR
-        mb.import_module(scripted._c, class_annotator, import_options)
-    except Exception as e:
-        raise Exception(f"""
-PyTorch TorchScript module -> torch-mlir Object Graph IR import failed with:
-### Importer C++ Exception:
-{e}
-### Importer Diagnostics:
-{sys.stderr.getvalue()}
-""") from None
+        if use_processes:
+            data = serialize_module(module)
+            futures = {
+                output_type: executor.submit(_lower_serialized_module, data,
+                                             output_type, verbose)
+                for output_type in output_types
+            }
+        else:
+            futures = {
+                output_type: executor.submit(_lower_module_timed,
+                                             clone_module(module),
+                                             output_type, verbose)
+                for output_type in output_types
+            }
+        modules = {}
+        times = {}
+        for output_type, future in futures.items():
+            lowered, times[output_type] = future.result()
+            if use_processes:
+                lowered = deserialize_module(lowered, module.context)
+            modules[output_type] = lowered
     finally:
-        sys.stderr = original_stderr
-    if output_type == OutputType.RAW:
-        return mb.module
+        if owns_executor:
+            executor.shutdown()
+    return modules, times
+
+
+def _compile_module_timed(module, output_type: OutputType,
+                          backend_legal_ops: List[str],
+                          extra_library_file_name: str, verbose: bool):
+    """Lowers `module` in place for `compile_many` in one of its threads."""
+    start = time.perf_counter()
+    _lower_to_backend_contract(module, backend_legal_ops,
+                               extra_library_file_name)
+    module = _lower_mlir_module(verbose, output_type, module)
+    return module, time.perf_counter() - start
+
+
+def _compile_serialized_module(data: bytes, output_type: OutputType,
+                               backend_legal_ops: List[str],
+                               extra_library_file_name: str,
+                               verbose: bool) -> Tuple[bytes, float]:
+    """Lowers a module serialized by `compile_many` in one of its workers."""
+    start = time.perf_counter()
+    module = deserialize_module(data)
+    _lower_to_backend_contract(module, backend_legal_ops,
+                               extra_library_file_name)
+    module = _lower_mlir_module(verbose, output_type, module)
+    return serialize_module(module), time.perf_counter() - start
+
+
+def compile_many(model: torch.nn.Module,
+                 example_args_list: Sequence[_example_args],
+                 output_type: Union[str, "OutputType"] = OutputType.TORCH,
+                 use_tracing: bool = False,
+                 ignore_traced_shapes=False,
+                 backend_legal_ops: Optional[Sequence[str]] = None,
+                 extra_library: Iterable[Callable] = [],
+                 executor: Optional[concurrent.futures.Executor] = None,
+                 max_workers: Optional[int] = None,
+                 verbose: bool = False):
+    """Convert a PyTorch model to MLIR for several sets of example args.
+
+    This is equivalent to calling `torch_mlir.compile` once per entry of
+    `example_args_list`, for example to compile one module per batch size,
+    but cheaper: the model is only scripted once (or traced once, if
+    `ignore_traced_shapes` is set) and annotated for import once, and the
+    pass pipelines of the different entries run concurrently.
+    ```python
+    modules, timings = torch_mlir.compile_many(
+        model, [torch.ones(batch_size, 128) for batch_size in [1, 8, 32]],
+        output_type="linalg-on-tensors")
+    ```
 
-    option_string = "{backend-legal-ops=" + ",".join(backend_legal_ops) + \
-        " extra-library=" + extra_library_file_name + "}"
-    run_pipeline_with_repro_report(
-        mb.module,
-        f"builtin.module(torchscript-module-to-torch-backend-pipeline{option_string})",
-        "Lowering TorchScript IR -> Torch Backend IR",
-    )
+    By default, the pass pipelines run on a thread pool, since the pass
+    manager releases the GIL while it runs. A
+    `concurrent.futures.ProcessPoolExecutor` can be passed as well, in which
+    case the imported modules are shipped to the worker processes as MLIR
+    bytecode. Such a pool should use the "spawn" start method, since forking
+    a process with a live MLIR context can deadlock.
+
+    Args:
+        model: The PyTorch model to convert.
+        example_args_list: A list of example args, each of which is allowed
+            to take any form accepted by `torch_mlir.compile`. All of them
+            must specify the same methods.
+        output_type: See `torch_mlir.compile`.
+        use_tracing: See `torch_mlir.compile`.
+        ignore_traced_shapes: See `torch_mlir.compile`.
+        backend_legal_ops: See `torch_mlir.compile`.
+        extra_library: See `torch_mlir.compile`.
+        executor: The executor to run the pass pipelines on. Defaults to a new
+            `concurrent.futures.ThreadPoolExecutor`.
+        max_workers: The number of workers of the default executor.
+        verbose: If true, print extra information about the conversion.
 
-    return _lower_mlir_module(verbose, output_type, mb.module)
+    Returns:
+        A list with one MLIR module per entry of `example_args_list`, each in
+        its own context, and a list with one dict per entry holding the wall
+        time in seconds spent in the `"script"`, `"import"` and `"lower"`
+        stages for it. Scripting is only accounted to the entries that
+        actually scripted or traced the model.
+    """
+    extra_library = list(extra_library)
+    output_type = OutputType.get(output_type)
+    example_args_list = [ExampleArgs.get(a) for a in example_args_list]
+    if ignore_traced_shapes and not use_tracing:
+        raise Exception("`ignore_traced_shapes` requires `use_tracing`")
+    backend_legal_ops = _get_backend_legal_ops(output_type, backend_legal_ops)
+
+    # Tracing bakes the shapes of the example args into the JIT IR, so we can
+    # only share the result if the user told us that the shapes don't matter.
+    share_scripted = not use_tracing or ignore_traced_shapes
+    scripted = None
+    class_annotator = None
+    imported_modules = []
+    timings = []
+    for example_args in example_args_list:
+        start = time.perf_counter()
+        if scripted is None or not share_scripted:
+            scripted = _get_scripted_model(model, example_args, use_tracing,
+                                           ignore_traced_shapes)
+            class_annotator = _create_class_annotator(
+                scripted, example_args._get_methods())
+        script_end = time.perf_counter()
+        module = _import_scripted_model(scripted,
+                                        example_args._get_for_annotation(),
+                                        ignore_traced_shapes, class_annotator)
+        imported_modules.append(module)
+        timings.append({
+            "script": script_end - start,
+            "import": time.perf_counter() - script_end,
+            "lower": 0.0,
+        })
+    if output_type == OutputType.RAW:
+        return imported_modules, timings
+
+    extra_library_file_name = _canon_extra_library(extra_library)
+    owns_executor = executor is None
+    if owns_executor:
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers)
+    # Modules cannot be pickled, so worker processes get them as bytecode.
+    use_processes = isinstance(executor,
+                               concurrent.futures.ProcessPoolExecutor)
+    try:
+        if use_processes:
+            futures = [
+                executor.submit(_compile_serialized_module,
+                                serialize_module(module), output_type,
+                                backend_legal_ops, extra_library_file_name,
+                                verbose)
+                for module in imported_modules
+            ]
+        else:
+            # Every imported module has its own context, so the threads do
+            # not share any IR.
+            futures = [
+                executor.submit(_compile_module_timed, module, output_type,
+                                backend_legal_ops, extra_library_file_name,
+                                verbose)
+                for module in imported_modules
+            ]
+        modules = []
+        for future, timing in zip(futures, timings):
+            lowered, timing["lower"] = future.result()
+            if use_processes:
+                lowered = deserialize_module(lowered)
+            modules.append(lowered)
+    finally:
+        if owns_executor:
+            executor.shutdown()
+    return modules, timings
@@ -21,8 +21,9 @@ import pdb
 # FX -> MLIR use cases should be done carefully, and likely will involve
 # introducing new concepts or abstractions into the import process.
 
-from typing import Dict, Tuple
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
 
+import functools
 import operator
 import re
 
@@ -34,57 +35,139 @@ import torch_mlir.dialects.torch as torch_dialect
 
 
 def _is_valid_meta_val(val):
-    # We currently allow only FakeTensor's or lists of FakeTensor's
-    # as meta['val']. However, this can potentially change also hold a SymInt
-    # in the future. See:
+    # We currently allow only FakeTensor's, lists of FakeTensor's, and SymInt's
+    # (for symbolic sizes when tracing with dynamic shapes) as meta['val']. See:
     # https://github.com/pytorch/pytorch/issues/90839#issuecomment-1352856661
-    if isinstance(val, torch._subclasses.FakeTensor):
+    if isinstance(val, (torch._subclasses.FakeTensor, torch.SymInt)):
         return True
     if isinstance(val, (tuple, list)):
         return all(isinstance(x, torch._subclasses.FakeTensor) for x in val)
     return False
 
 
-def _verify_fx_graph_conforms_to_subset(g: torch.fx.Graph):
+# The `torch` dialect ops for the Python operators that FX uses to compute
+# symbolic sizes.
+_SYMBOLIC_OPERATOR_TO_MLIR_OP_NAME = {
+    operator.add: "torch.aten.add.int",
+    operator.sub: "torch.aten.sub.int",
+    operator.mul: "torch.aten.mul.int",
+    operator.floordiv: "torch.aten.floordiv.int",
+}
+
+
+# Ops for symbolic sizes, which have a regular counterpart in the `torch`
+# dialect.
+_SYMBOLIC_SIZE_OP_TO_MLIR_OP_NAME = {
+    "aten::sym_size.int": "torch.aten.size.int",
+    "aten::sym_numel": "torch.aten.numel",
+}
+
+
+class _OpOverloadInfo(NamedTuple):
+    """What the verifier and the importer need to know about an OpOverload."""
+    # The name of the `torch` dialect op.
+    mlir_op_name: str
+    # The formal parameters in the schema.
+    arguments: Tuple[torch._C.Argument, ...]
+    # The return types in the schema that are not tensors.
+    non_tensor_return_types: Tuple[torch.Type, ...]
+
+
+@functools.lru_cache(maxsize=None)
+def _get_op_overload_info(op_overload: torch._ops.OpOverload) -> _OpOverloadInfo:
+    """Gets the information about `op_overload` derived from its schema.
+
+    Large graphs call the same few overloads over and over, so this is only
+    computed once per overload.
+    """
+    schema = op_overload._schema
+    qualified_name = schema.name
+    if schema.overload_name != "":
+        qualified_name += f".{schema.overload_name}"
+    if qualified_name in _SYMBOLIC_SIZE_OP_TO_MLIR_OP_NAME:
+        mlir_op_name = _SYMBOLIC_SIZE_OP_TO_MLIR_OP_NAME[qualified_name]
+    else:
+        namespace, _, unqualified_name = schema.name.partition("::")
+        mlir_op_name = f"torch.{namespace}.{unqualified_name}"
+        if schema.overload_name != "":
+            mlir_op_name += f".{schema.overload_name}"
+    return _OpOverloadInfo(
+        mlir_op_name=mlir_op_name,
+        arguments=tuple(schema.arguments),
+        non_tensor_return_types=tuple(
+            r.type for r in schema.returns
+            if not isinstance(r.type, torch.TensorType)),
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def _check_op_overload_call(op_overload: torch._ops.OpOverload,
+                            num_args: int,
+                            returns_sym_int: bool) -> Optional[str]:
+    """Checks a call to `op_overload` with `num_args` positional arguments.
+
+    The result only depends on the overload and on the shape of the call, so
+    it is memoized, which keeps verification cheap for large graphs.
+
+    Returns:
+        The reason why the call is unsupported, or None if it is supported.
+    """
+    info = _get_op_overload_info(op_overload)
+    for type_ in info.non_tensor_return_types:
+        # Symbolic size computations such as `aten.sym_size`.
+        if isinstance(type_, (torch.IntType, torch._C.SymIntType)) \
+                and returns_sym_int:
+            continue
+        return f"return type {type_} in schema for {op_overload}"
+    assert num_args <= len(info.arguments)
+    for i, argument in enumerate(info.arguments[num_args:]):
+        if not argument.has_default_value():
+            return (f"missing default value for argument {i} in schema for "
+                    f"{op_overload}")
+    return None
+
+
+def _check_meta_val(node: torch.fx.Node):
+    if "val" not in node.meta:
+        raise Exception(f"Unsupported: missing node.meta['val']: {node}")
+    if not _is_valid_meta_val(node.meta["val"]):
+        raise Exception(
+            f"Unsupported: node.meta['val'] is not a FakeTensor, list of FakeTensor's or SymInt: {node}; {node.meta['val']}"
+        )
+
+
+def _verify_node_conforms_to_subset(node: torch.fx.Node):
     # TODO: Report errors with source locations if possible.
-    def _check_meta_val(node):
-        if "val" not in node.meta:
-            raise Exception(f"Unsupported: missing node.meta['val']: {node}")
-        if not _is_valid_meta_val(node.meta["val"]):
-            raise Exception(
-                f"Unsupported: node.meta['val'] is not a FakeTensor or list of FakeTensor's: {node}; {node.meta['val']}"
-            )
+    if node.op not in ("placeholder", "call_function", "output"):
+        raise Exception(f"Unsupported op: {node.op}")
+    if node.op == "placeholder":
+        _check_meta_val(node)
+    if node.op == "call_function":
+        _check_meta_val(node)
+        # We only support OpOverload for computations because the `torch`
+        # dialect ops model the full qualified op name, including overload.
+        # We also support operator.getitem because that is how multiple
+        # results are modeled.
+        if isinstance(node.target, torch._ops.OpOverload):
+            error = _check_op_overload_call(
+                node.target, len(node.args),
+                isinstance(node.meta["val"], torch.SymInt))
+            if error is not None:
+                raise Exception(f"Unsupported: {error}")
+            return
+        if node.target is operator.getitem:
+            return
+        if node.target in _SYMBOLIC_OPERATOR_TO_MLIR_OP_NAME and \
+                isinstance(node.meta["val"], torch.SymInt):
+            return
+        raise Exception(f"Unsupported call_function target: {node.target}")
+
 
+def _verify_fx_graph_conforms_to_subset(g: torch.fx.Graph):
+    # The importer verifies each node right before importing it, so that the
+    # graph is only walked once. This function verifies a graph on its own.
     for node in g.nodes:
-        if node.op not in ("placeholder", "call_function", "output"):
-            raise Exception(f"Unsupported op: {node.op}")
-        if node.op == "placeholder":
-            _check_meta_val(node)
-        if node.op == "call_function":
-            _check_meta_val(node)
-            # We only support OpOverload for computations because the `torch`
-            # dialect ops model the full qualified op name, including overload.
-            # We also support operator.getitem because that is how multiple
-            # results are modeled.
-            if isinstance(node.target, torch._ops.OpOverload):
-                for type_ in (r.type for r in node.target._schema.returns):
-                    if isinstance(type_, torch.TensorType):
-                        continue
-                    raise Exception(
-                        f"Unsupported: return type {type_} in schema for {node.target}"
-                    )
-                if len(node.args) != len(node.target._schema.arguments):
-                    assert len(node.args) < len(node.target._schema.arguments)
-                    for i, argument in enumerate(
-                            node.target._schema.arguments[len(node.args):]):
-                        if not argument.has_default_value():
-                            raise Exception(
-                                f"Unsupported: missing default value for argument {i} in schema for {node.target}"
-                            )
-                continue
-            if node.target is operator.getitem:
-                continue
-            raise Exception(f"Unsupported call_function target: {node.target}")
+        _verify_node_conforms_to_subset(node)
 
 
 # ==============================================================================
@@ -120,66 +203,102 @@ def _torch_type_to_mlir_type(t: torch.Type):
     return ir.Type.parse(f"!torch.{_torch_type_to_mlir_type_string(t)}")
 
 
+# See the table in TorchTypes.td:AnyTorchTensorType's documentation.
+_DTYPE_TO_MLIR_TYPE_STRING = {
+    torch.float16: "f16",
+    torch.bfloat16: "bf16",
+    torch.float32: "f32",
+    torch.float64: "f64",
+    torch.uint8: "ui8",
+    torch.int8: "si8",
+    torch.int16: "si16",
+    torch.int32: "si32",
+    torch.int64: "si64",
+    torch.bool: "i1",
+    torch.qint8: "!torch.qint8",
+    torch.quint8: "!torch.quint8",
+    torch.complex64: "complex<f64>",
+}
+
+
 def _convert_dtype_to_mlir_type(dtype: torch.dtype) -> str:
-    # See the table in TorchTypes.td:AnyTorchTensorType's documentation.
-    if dtype == torch.float16:
-        return "f16"
-    if dtype == torch.bfloat16:
-        return "bf16"
-    if dtype == torch.float32:
-        return "f32"
-    if dtype == torch.float64:
-        return "f64"
-    if dtype == torch.uint8:
-        return "ui8"
-    if dtype == torch.int8:
-        return "si8"
-    if dtype == torch.int16:
-        return "si16"
-    if dtype == torch.int32:
-        return "si32"
-    if dtype == torch.int64:
-        return "si64"
-    if dtype == torch.bool:
-        return "i1"
-    if dtype == torch.qint8:
-        return "!torch.qint8"
-    if dtype == torch.quint8:
-        return "!torch.quint8"
-    if dtype == torch.complex64:
-        return "complex<f64>"
-
-
-    raise Exception(f"Unsupported dtype: {dtype}")
+    mlir_type = _DTYPE_TO_MLIR_TYPE_STRING.get(dtype)
+    if mlir_type is None:
+        raise Exception(f"Unsupported dtype: {dtype}")
+    return mlir_type
+
+
+def _get_static_shape(
+        fake_tensor: torch._subclasses.FakeTensor) -> Tuple[Optional[int], ...]:
+    """Gets the shape of `fake_tensor`, with None for symbolic sizes."""
+    return tuple(d if isinstance(d, int) else None for d in fake_tensor.shape)
 
 
 def _import_fake_tensor_as_mlir_type(
         fake_tensor: torch._subclasses.FakeTensor) -> ir.Type:
-    # TODO: Find story for how to get dynamically shaped tensors here.
-    shape = ",".join(str(d) for d in fake_tensor.shape)
+    # Symbolic sizes, which Dynamo produces for dimensions it traced as
+    # dynamic, become unknown sizes.
+    shape = ",".join("?" if d is None else str(d)
+                     for d in _get_static_shape(fake_tensor))
     dtype = _convert_dtype_to_mlir_type(fake_tensor.dtype)
     return ir.Type.parse(f"!torch.vtensor<[{shape}],{dtype}>")
 
 
-def _mlir_types_for_node(node: torch.fx.Node) -> ir.Type:
+class _TypeCache:
+    """Caches the MLIR types created while importing into one context.
+
+    Parsing a type is much more expensive than a dict lookup, and even graphs
+    with tens of thousands of nodes tend to use only a handful of distinct
+    types. The cache must only be used within the context it was created in.
+    """
+
+    def __init__(self):
+        self._tensor_types: Dict[Tuple[Tuple[Optional[int], ...],
+                                       torch.dtype], ir.Type] = {}
+        self._torch_types: Dict[str, ir.Type] = {}
+
+    def import_meta_val(self, val) -> ir.Type:
+        """Gets the MLIR type for a valid `node.meta['val']` element."""
+        if isinstance(val, torch.SymInt):
+            return self.import_torch_type(torch.IntType.get())
+        return self.import_fake_tensor(val)
+
+    def import_fake_tensor(
+            self, fake_tensor: torch._subclasses.FakeTensor) -> ir.Type:
+        # Symbolic sizes are not hashable, so they are replaced by None.
+        key = (_get_static_shape(fake_tensor), fake_tensor.dtype)
+        mlir_type = self._tensor_types.get(key)
+        if mlir_type is None:
+            mlir_type = _import_fake_tensor_as_mlir_type(fake_tensor)
+            self._tensor_types[key] = mlir_type
+        return mlir_type
+
+    def import_torch_type(self, t: torch.Type) -> ir.Type:
+        # The string form of a `torch.Type` identifies it uniquely, and unlike
+        # the `torch.Type` itself is guaranteed to be hashable.
+        key = str(t)
+        mlir_type = self._torch_types.get(key)
+        if mlir_type is None:
+            mlir_type = _torch_type_to_mlir_type(t)
+            self._torch_types[key] = mlir_type
+        return mlir_type
+
+
+def _mlir_types_for_node(node: torch.fx.Node,
+                         type_cache: _TypeCache) -> ir.Type:
     if isinstance(node.meta["val"], (tuple, list)):
-        return [_import_fake_tensor_as_mlir_type(v) for v in node.meta["val"]]
-    return [_import_fake_tensor_as_mlir_type(node.meta["val"])]
+        return [type_cache.import_meta_val(v) for v in node.meta["val"]]
+    return [type_cache.import_meta_val(node.meta["val"])]
 
 
-def _extract_function_type_from_graph(g: torch.fx.Graph) -> ir.FunctionType:
+def _extract_input_types_from_graph(g: torch.fx.Graph,
+                                    type_cache: _TypeCache) -> List[ir.Type]:
     input_types = []
     for node in g.nodes:
         if node.op == "placeholder":
-            input_types.append(_mlir_types_for_node(node)[0])
-        if node.op == "output":
-            # TODO(DNS): Test this or add verifier that it can't happen.
-            result_types = torch.fx.map_arg(
-                node.args[0], lambda n: _mlir_types_for_node(n)[0])
-    # Note: We import directly to the backend contract -- multiple results
-    # are modeled with func.func native multiple results rather than as a
-    # singleton value / tuple.
-    return ir.FunctionType.get(input_types, result_types)
+            _verify_node_conforms_to_subset(node)
+            input_types.append(_mlir_types_for_node(node, type_cache)[0])
+    return input_types
 
 
 # ==============================================================================
@@ -249,6 +368,18 @@ LAYOUT_TO_INT = {
 }
 
 
+def _literal_cache_key(arg: torch.fx.node.Argument) -> Any:
+    """Gets a key identifying the constant that the literal `arg` imports as."""
+    if isinstance(arg, float):
+        # Unlike the float itself, this distinguishes 0.0 from -0.0 and makes
+        # NaN equal to itself.
+        return (float, arg.hex())
+    if isinstance(arg, (list, tuple)):
+        return (type(arg), tuple(_literal_cache_key(a) for a in arg))
+    # The type is part of the key since e.g. `True == 1`.
+    return (type(arg), arg)
+
+
 def _mlir_location_for_node(node: torch.fx.Node) -> ir.Location:
     stack_trace = node.stack_trace
     if stack_trace is None:
@@ -272,23 +403,40 @@ class _FXGraphImporter:
         # node.meta['val'] is set up, since it contains a list with multiple
         # FakeTensor's in case of a tuple return with multiple elements.
         self._env: Dict[Tuple[torch.fx.Node, int], ir.Value] = {}
+        self._type_cache = _TypeCache()
+        # Literals are imported as constants at the start of the function, and
+        # each distinct constant only once. This maps the keys of the literals
+        # imported so far to the corresponding constants.
+        self._constants: Dict[Any, ir.Value] = {}
+        # The first operation that is not a constant. New constants are
+        # inserted before it, which keeps them at the start of the function in
+        # the order they were created.
+        self._first_non_constant_op: Optional[ir.Operation] = None
+        # The names of the ops that are known to be registered.
+        self._registered_op_names: Set[str] = set()
         self._module = ir.Module.create(ir.Location.unknown())
         self._module.operation.attributes[
             "torch.debug_module_name"] = ir.StringAttr.get(func_name)
-        function_type = _extract_function_type_from_graph(g)
-        func = func_dialect.FuncOp(
+        self._input_types = _extract_input_types_from_graph(
+            g, self._type_cache)
+        # The result types are set once the output node is imported.
+        self._func = func_dialect.FuncOp(
             func_name,
-            function_type,
+            ir.FunctionType.get(self._input_types, []),
             loc=ir.Location.unknown(),  # TODO: Can we do better?
             ip=ir.InsertionPoint(self._module.body),
         )
-        self._body_block = ir.Block.create_at_start(func.body,
-                                                    function_type.inputs)
+        self._body_block = ir.Block.create_at_start(self._func.body,
+                                                    self._input_types)
 
     def import_graph(self) -> ir.Module:
         with ir.InsertionPoint(self._body_block):
             num_placeholders_seen = 0
             for node in self._g.nodes:
+                # Placeholders were already verified while extracting the
+                # input types.
+                if node.op != "placeholder":
+                    _verify_node_conforms_to_subset(node)
                 with _mlir_location_for_node(node):
                     if node.op == "placeholder":
                         self._env[(
@@ -299,6 +447,8 @@ class _FXGraphImporter:
                         if node.target is operator.getitem:
                             self._env[(node, 0)] = self._env[(node.args[0],
                                                               node.args[1])]
+                        elif node.target in _SYMBOLIC_OPERATOR_TO_MLIR_OP_NAME:
+                            self._import_symbolic_operator_call(node)
                         else:
                             self._import_op_overload_call(node)
                     if node.op == "output":
@@ -310,30 +460,37 @@ class _FXGraphImporter:
                             self._import_argument(arg) for arg in node.args[0]
                         ]
                         func_dialect.ReturnOp(operands)
+                        # Note: We import directly to the backend contract --
+                        # multiple results are modeled with func.func native
+                        # multiple results rather than as a singleton value /
+                        # tuple.
+                        self._func.attributes["function_type"] = \
+                            ir.TypeAttr.get(ir.FunctionType.get(
+                                self._input_types,
+                                [operand.type for operand in operands]))
         return self._module
 
     def _import_op_overload_call(self, node: torch.fx.Node):
         assert node.op == "call_function"
         assert isinstance(node.target, torch._ops.OpOverload)
-        schema = node.target._schema
 
         # Extract the `torch` dialect op name.
-        namespace, _, unqualified_name = schema.name.partition("::")
-        mlir_op_name = f"torch.{namespace}.{unqualified_name}"
-        if schema.overload_name != "":
-            mlir_op_name += f".{schema.overload_name}"
+        op_overload_info = _get_op_overload_info(node.target)
+        mlir_op_name = op_overload_info.mlir_op_name
 
         # DNS: Unregistered ops
-        assert ir.Context.current.is_registered_operation(
-            mlir_op_name), f"Unregistered operation: {mlir_op_name}"
+        if mlir_op_name not in self._registered_op_names:
+            assert ir.Context.current.is_registered_operation(
+                mlir_op_name), f"Unregistered operation: {mlir_op_name}"
+            self._registered_op_names.add(mlir_op_name)
 
         # Construct the Operation.
-        result_types = _mlir_types_for_node(node)
+        result_types = _mlir_types_for_node(node, self._type_cache)
         operands = []
         # `schema.arguments` is a bit confusing in this context, since
         # `Argument` is the term that FX uses analogous to mlir "Value". It is
         # more precise to call them "formal parameters".
-        for i, parameter in enumerate(node.target._schema.arguments):
+        for i, parameter in enumerate(op_overload_info.arguments):
             if parameter.kwarg_only and parameter.name in node.kwargs:
                 arg = node.kwargs[parameter.name]
             elif i < len(node.args):
@@ -346,9 +503,24 @@ class _FXGraphImporter:
             results=result_types,
             operands=operands,
         )
+        self._note_non_constant_op(operation)
         for i, value in enumerate(operation.results):
             self._env[(node, i)] = value
 
+    def _import_symbolic_operator_call(self, node: torch.fx.Node):
+        assert node.op == "call_function"
+        operands = [
+            self._import_argument(arg, torch.IntType.get())
+            for arg in node.args
+        ]
+        operation = ir.Operation.create(
+            _SYMBOLIC_OPERATOR_TO_MLIR_OP_NAME[node.target],
+            results=_mlir_types_for_node(node, self._type_cache),
+            operands=operands,
+        )
+        self._note_non_constant_op(operation)
+        self._env[(node, 0)] = operation.results[0]
+
     def _import_argument(self,
                          arg: torch.fx.node.Argument,
                          expected_type_for_literal=None) -> ir.Value:
@@ -368,8 +540,38 @@ class _FXGraphImporter:
         assert expected_type_for_literal is not None
         return self._import_literal(arg, expected_type_for_literal)
 
+    def _note_non_constant_op(self, operation: ir.Operation):
+        if self._first_non_constant_op is None:
+            self._first_non_constant_op = operation
+
     def _import_literal(self, arg: torch.fx.node.Argument,
                         expected_type) -> ir.Value:
+        # Lists of tensors or of symbolic sizes are built from values computed
+        # in the function, so they are not constants.
+        if isinstance(arg, list) and any(
+                isinstance(a, torch.fx.Node) for a in arg):
+            value = self._create_literal(arg, expected_type)
+            self._note_non_constant_op(value.owner)
+            return value
+
+        # The list type is part of the key, since e.g. an empty list can be
+        # of any type.
+        key = _literal_cache_key(arg)
+        if isinstance(arg, list):
+            key = (key, str(expected_type))
+        value = self._constants.get(key)
+        if value is None:
+            if self._first_non_constant_op is None:
+                insertion_point = ir.InsertionPoint(self._body_block)
+            else:
+                insertion_point = ir.InsertionPoint(self._first_non_constant_op)
+            with insertion_point:
+                value = self._create_literal(arg, expected_type)
+            self._constants[key] = value
+        return value
+
+    def _create_literal(self, arg: torch.fx.node.Argument,
+                        expected_type) -> ir.Value:
         if arg is None:
             return torch_dialect.ConstantNoneOp().result
         if isinstance(expected_type, torch.OptionalType):
@@ -410,7 +612,6 @@ class _FXGraphImporter:
                 els = [self._env[e, 0] for e in arg]
 
             else:
-                element_type = _torch_type_to_mlir_type(element_type)
                 els = [
                     self._import_argument(e, element_type) for e in arg
                 ]
@@ -418,7 +619,7 @@ class _FXGraphImporter:
             # import pydevd_pycharm
             # pydevd_pycharm.settrace('localhost', port=8888, stdoutToServer=True, stderrToServer=True)
             return torch_dialect.PrimListConstructOp(
-                _torch_type_to_mlir_type(expected_type),
+                self._type_cache.import_torch_type(expected_type),
                 els,
             ).result
         raise Exception(f"Unsupported literal: {arg}")
@@ -436,7 +637,8 @@ def import_fx_graph_as_func(g: torch.fx.Graph, func_name: str) -> ir.Module:
     # Note that this function imports a fx.Graph instead of an fx.GraphModule.
     # The reason is that the supported subset only involves stateless
     # fx.Graph's, so the state held on the fx.GraphModule is not necessary.
-    _verify_fx_graph_conforms_to_subset(g)
+    # The graph is verified to conform to the supported subset as it is
+    # imported.
     with ir.Context() as context:
         torch_dialect.register_dialect(context)
         return _FXGraphImporter(g, func_name).import_graph()
@@ -0,0 +1,556 @@
+# Part of the LLVM Project, under the Apache License v2.0 with LLVM Exceptions.
+# See https://llvm.org/LICENSE.txt for license information.
+# SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
+# Also available under a BSD-style license. See LICENSE.
+
+# This file implements caching of the modules produced by `torch_mlir.compile`
+# and by the TorchDynamo integration.
+#
+# Compiling a model involves scripting it, importing it through the JIT IR
+# importer, and running several pass pipelines over the result. When the same
+# model is compiled again with the same options, all of that work produces the
+# same module, so we look the lowered module up under a content-addressed key
+# instead.
+
+import abc
+import collections
+import functools
+import hashlib
+import inspect
+import os
+import tempfile
+import threading
+import weakref
+from typing import Callable, Iterable, Optional, Sequence
+
+import torch
+import torch.fx
+
+from torch_mlir import ir
+from torch_mlir.compiler_utils import (
+    capture_stderr,
+    deserialize_module,
+    serialize_module,
+)
+
+# Bump this whenever the layout of the cache key or of the cached files
+# changes, so that stale entries are never read back.
+_CACHE_FORMAT_VERSION = "2"
+
+_CACHE_FILE_SUFFIX = ".mlirbc"
+
+
+@functools.lru_cache(maxsize=None)
+def _get_torch_mlir_version() -> str:
+    """Gets a string identifying the installed torch-mlir build.
+
+    Development builds all share the same package version, so the native
+    extension's size and modification time are mixed in as well. This makes
+    sure that rebuilding torch-mlir invalidates anything cached by a previous
+    build.
+    """
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+        try:
+            package_version = version("torch-mlir")
+        except PackageNotFoundError:
+            package_version = "unknown"
+    except ImportError:
+        package_version = "unknown"
+    from torch_mlir._mlir_libs import _torchMlir
+    stat = os.stat(_torchMlir.__file__)
+    return f"{package_version}:{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def _compute_tensor_digest(tensor: torch.Tensor) -> str:
+    """Computes a hex digest of the dtype, shape and contents of `tensor`."""
+    hasher = hashlib.sha256()
+    tensor = tensor.detach()
+    if tensor.is_quantized:
+        hasher.update(
+            f"{tensor.qscheme()}:{tensor.q_scale()}:{tensor.q_zero_point()}"
+            .encode())
+        tensor = tensor.int_repr()
+    hasher.update(f"{tensor.dtype}:{list(tensor.shape)}".encode())
+    # Reinterpreting as bytes lets us hash dtypes that numpy cannot represent,
+    # such as bfloat16.
+    data = tensor.cpu().contiguous().reshape(-1).view(torch.uint8)
+    hasher.update(data.numpy())
+    return hasher.hexdigest()
+
+
+# Maps the id of each tensor hashed so far to a weak reference to it, its
+# version counter and storage pointer at the time, and its digest. Entries
+# are removed when their tensor is collected.
+_tensor_digests = {}
+_tensor_digests_lock = threading.Lock()
+
+
+def _get_tensor_digest(tensor: torch.Tensor) -> str:
+    """Gets the digest of `tensor`, reusing the one computed for it before
+    if it was not modified since.
+
+    Scripting a model shares its parameters and buffers, so compiling the
+    same model again, for example to look it up in a cache, only hashes the
+    weights that changed in between.
+    """
+    try:
+        # In-place updates bump the version counter, and assigning to
+        # `.data` changes the storage.
+        version = (tensor._version, tensor.data_ptr())
+    except RuntimeError:
+        # Inference tensors have no version counter.
+        return _compute_tensor_digest(tensor)
+    key = id(tensor)
+    with _tensor_digests_lock:
+        entry = _tensor_digests.get(key)
+    if entry is not None and entry[0]() is tensor and entry[1] == version:
+        return entry[2]
+    digest = _compute_tensor_digest(tensor)
+    with _tensor_digests_lock:
+        if key not in _tensor_digests:
+            weakref.finalize(tensor, _forget_tensor_digest, key)
+        _tensor_digests[key] = (weakref.ref(tensor), version, digest)
+    return digest
+
+
+def _forget_tensor_digest(key: int):
+    with _tensor_digests_lock:
+        _tensor_digests.pop(key, None)
+
+
+def _update_with_tensor(hasher, tensor: torch.Tensor):
+    """Mixes the dtype, shape and contents of `tensor` into `hasher`."""
+    hasher.update(_get_tensor_digest(tensor).encode())
+
+
+def _update_with_callables(hasher, callables: Iterable[Callable]):
+    """Mixes the source code of each of `callables` into `hasher`."""
+    for f in callables:
+        hasher.update(f.__name__.encode())
+        try:
+            source = inspect.getsource(f)
+        except (OSError, TypeError):
+            # Functions defined in a REPL have no retrievable source, so fall
+            # back to their bytecode.
+            source = repr(f.__code__.co_code) + repr(f.__code__.co_consts)
+        hasher.update(source.encode())
+
+
+def compute_cache_key(scripted: Optional[torch.jit.ScriptModule],
+                      annotations,
+                      output_type: str,
+                      backend_legal_ops: Sequence[str],
+                      extra_library: Iterable[Callable],
+                      ignore_traced_shapes: bool,
+                      model_key: Optional[str] = None,
+                      use_tracing: bool = False) -> str:
+    """Computes the cache key for one invocation of `torch_mlir.compile`.
+
+    The weights of the model are hashed once and then memoized for as long as
+    they are not modified, but the code of the model is dumped and hashed on
+    every call. Callers that can identify the model themselves pass
+    `model_key` instead, so the model need not even be scripted.
+
+    Args:
+        scripted: The scripted (or traced) model that is about to be imported.
+            Must be None if `model_key` is specified.
+        annotations: The result of `ExampleArgs._get_for_annotation()`.
+        output_type: The value of the requested `OutputType`.
+        backend_legal_ops: The ops that are legal for the backend.
+        extra_library: The user's abstract interpretation functions.
+        ignore_traced_shapes: Whether tensor shapes in the JIT IR are ignored
+            during import.
+        model_key: A string identifying the code and weights of the model,
+            used instead of hashing `scripted`.
+        use_tracing: Whether the model is traced rather than scripted. Only
+            used with `model_key`, since `scripted` reflects it otherwise.
+    Returns:
+        A hex digest that identifies the compiled module.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(_CACHE_FORMAT_VERSION.encode())
+    hasher.update(_get_torch_mlir_version().encode())
+    hasher.update(torch.__version__.encode())
+    if model_key is not None:
+        hasher.update(f"model_key:{model_key}:{use_tracing};".encode())
+    else:
+        # The dump covers the code of every method and the values of the
+        # non-tensor attributes of the module and all its submodules.
+        hasher.update(scripted._c.dump_to_str(True, True, False).encode())
+        for name, tensor in scripted.named_parameters():
+            hasher.update(name.encode())
+            _update_with_tensor(hasher, tensor)
+        for name, tensor in scripted.named_buffers():
+            hasher.update(name.encode())
+            _update_with_tensor(hasher, tensor)
+    for method_name, placeholders in sorted(annotations.items()):
+        hasher.update(method_name.encode())
+        for placeholder in placeholders:
+            hasher.update(
+                f"{list(placeholder.shape)}:{placeholder.dtype}".encode())
+    hasher.update(output_type.encode())
+    hasher.update(",".join(backend_legal_ops).encode())
+    _update_with_callables(hasher, extra_library)
+    hasher.update(str(ignore_traced_shapes).encode())
+    return hasher.hexdigest()
+
+
+def compute_extra_library_cache_key(extra_library: Iterable[Callable]) -> str:
+    """Computes the cache key for the MLIR generated from `extra_library`.
+
+    Args:
+        extra_library: The user's abstract interpretation functions.
+    Returns:
+        A hex digest that identifies the generated library.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(_CACHE_FORMAT_VERSION.encode())
+    hasher.update(_get_torch_mlir_version().encode())
+    hasher.update(torch.__version__.encode())
+    _update_with_callables(hasher, extra_library)
+    return hasher.hexdigest()
+
+
+def compute_lowering_cache_key(module: ir.Module, output_type: str) -> str:
+    """Computes the cache key for lowering `module` to `output_type`.
+
+    Args:
+        module: A module that satisfies the Torch backend contract.
+        output_type: The value of the requested `OutputType`.
+    Returns:
+        A hex digest that identifies the lowered module.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(_CACHE_FORMAT_VERSION.encode())
+    hasher.update(_get_torch_mlir_version().encode())
+    hasher.update(serialize_module(module))
+    hasher.update(output_type.encode())
+    return hasher.hexdigest()
+
+
+def _get_fx_target_name(target) -> str:
+    """Gets a name for the target of an FX node that is stable across runs."""
+    if isinstance(target, str):
+        return target
+    if isinstance(target, (torch._ops.OpOverload, torch._ops.OpOverloadPacket)):
+        return str(target)
+    return (f"{getattr(target, '__module__', '')}."
+            f"{getattr(target, '__qualname__', repr(target))}")
+
+
+def _update_with_fx_argument(hasher, arg, node_indices):
+    """Mixes an argument of an FX node into `hasher`.
+
+    References to other nodes are replaced by their position in the graph, so
+    that the hash does not depend on the names FX gave to the nodes.
+    """
+    if isinstance(arg, torch.fx.Node):
+        hasher.update(f"%{node_indices[arg]};".encode())
+    elif isinstance(arg, (list, tuple)):
+        hasher.update(f"{type(arg).__name__}{len(arg)}(".encode())
+        for element in arg:
+            _update_with_fx_argument(hasher, element, node_indices)
+        hasher.update(b")")
+    elif isinstance(arg, dict):
+        hasher.update(f"dict{len(arg)}(".encode())
+        for key in sorted(arg, key=str):
+            hasher.update(f"{key}=".encode())
+            _update_with_fx_argument(hasher, arg[key], node_indices)
+        hasher.update(b")")
+    elif isinstance(arg, float):
+        hasher.update(f"float:{arg.hex()};".encode())
+    elif isinstance(arg, torch.Tensor):
+        _update_with_tensor(hasher, arg)
+    else:
+        hasher.update(f"{type(arg).__qualname__}:{arg!r};".encode())
+
+
+def _update_with_fx_meta_val(hasher, val):
+    """Mixes the `meta["val"]` of an FX node into `hasher`.
+
+    Tensors contribute their dtype, shape and device, which the importer
+    turns into types, as well as their layout, strides and `requires_grad`,
+    which the compiled code or autograd may depend on. Symbolic sizes are
+    printed as their expressions.
+    """
+    if isinstance(val, torch.Tensor):
+        strides = list(val.stride()) if val.layout == torch.strided else None
+        hasher.update(
+            f"tensor:{val.dtype}:{list(val.shape)}:{val.device}:{val.layout}:"
+            f"{strides}:{val.requires_grad};".encode())
+    elif isinstance(val, (list, tuple)):
+        hasher.update(f"{type(val).__name__}{len(val)}(".encode())
+        for element in val:
+            _update_with_fx_meta_val(hasher, element)
+        hasher.update(b")")
+    else:
+        hasher.update(f"{type(val).__qualname__}:{val};".encode())
+
+
+def _update_with_fx_attribute(hasher, gm: torch.fx.GraphModule, target: str):
+    """Mixes the attribute of `gm` named `target` into `hasher`."""
+    value = gm
+    for atom in target.split("."):
+        value = getattr(value, atom)
+    if isinstance(value, torch.Tensor):
+        _update_with_tensor(hasher, value)
+    elif isinstance(value, torch.nn.Module):
+        hasher.update(repr(value).encode())
+        for name, tensor in value.state_dict().items():
+            hasher.update(name.encode())
+            _update_with_tensor(hasher, tensor)
+    else:
+        hasher.update(f"{type(value).__qualname__}:{value!r};".encode())
+
+
+def compute_fx_graph_hash(gm: torch.fx.GraphModule) -> str:
+    """Computes a structural hash of the graph of `gm`.
+
+    Two graphs get the same hash if they call the same targets with the same
+    arguments in the same order, and their nodes carry values of the same
+    shapes, strides and dtypes. Node names, source locations and the values of
+    placeholders do not contribute to the hash, whereas the contents of the
+    tensors that the graph reads from `gm` do.
+
+    Args:
+        gm: The graph module to hash.
+    Returns:
+        A hex digest that identifies the structure of the graph.
+    """
+    hasher = hashlib.sha256()
+    node_indices = {}
+    for index, node in enumerate(gm.graph.nodes):
+        node_indices[node] = index
+        hasher.update(f"{node.op}:".encode())
+        if node.op in ("get_attr", "call_module"):
+            _update_with_fx_attribute(hasher, gm, node.target)
+        elif node.op != "placeholder":
+            hasher.update(_get_fx_target_name(node.target).encode())
+        _update_with_fx_argument(hasher, node.args, node_indices)
+        _update_with_fx_argument(hasher, node.kwargs, node_indices)
+        _update_with_fx_meta_val(hasher, node.meta.get("val"))
+    return hasher.hexdigest()
+
+
+def compute_fx_graph_cache_key(gm: torch.fx.GraphModule,
+                               func_name: str,
+                               output_type: str,
+                               backend_legal_ops: Sequence[str],
+                               extra_library: Iterable[Callable]) -> str:
+    """Computes the cache key for compiling an FX graph with torch-mlir.
+
+    Args:
+        gm: The graph module that is about to be imported.
+        func_name: The name of the function the graph is imported as.
+        output_type: The value of the requested `OutputType`.
+        backend_legal_ops: The ops that are legal for the backend.
+        extra_library: The user's abstract interpretation functions.
+    Returns:
+        A hex digest that identifies the compiled module.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(_CACHE_FORMAT_VERSION.encode())
+    hasher.update(_get_torch_mlir_version().encode())
+    hasher.update(torch.__version__.encode())
+    hasher.update(compute_fx_graph_hash(gm).encode())
+    hasher.update(func_name.encode())
+    hasher.update(output_type.encode())
+    hasher.update(",".join(backend_legal_ops).encode())
+    _update_with_callables(hasher, extra_library)
+    return hasher.hexdigest()
+
+
+class CompileCache(abc.ABC):
+    """The interface to a cache of compiled modules.
+
+    Caches map the keys computed by `compute_cache_key`,
+    `compute_fx_graph_cache_key` or `compute_lowering_cache_key` to modules.
+    Every module returned by `get` is a fresh copy in its own context, so
+    callers are free to mutate it.
+
+    Caches count their `hits`, `misses` and `evictions`.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[ir.Module]:
+        """Gets the module stored under `key`, or None if there is none."""
+
+    @abc.abstractmethod
+    def put(self, key: str, module: ir.Module):
+        """Stores a copy of `module` under `key`."""
+
+
+class InMemoryCompileCache(CompileCache):
+    """A cache of compiled modules that lives in the current process.
+
+    At most `max_entries` modules are kept, as serialized bytecode. When the
+    cache is full, storing a new module evicts the least recently used one.
+    The cache can be shared between threads.
+
+    ```python
+    cache = torch_mlir.InMemoryCompileCache(max_entries=32)
+    for batch_size in [1, 1, 8, 8]:
+        module = torch_mlir.compile(model, torch.ones(batch_size, 3),
+                                    cache=cache)
+    print(cache.hits, cache.misses, cache.evictions)  # 2 2 0
+    ```
+    """
+
+    def __init__(self, max_entries: int = 128):
+        """Create a cache holding at most `max_entries` modules."""
+        super().__init__()
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[ir.Module]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return deserialize_module(data)
+
+    def put(self, key: str, module: ir.Module):
+        data = serialize_module(module)
+        with self._lock:
+            self._entries[key] = data
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Removes all entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskCompileCache(CompileCache):
+    """A persistent, content-addressed cache of compiled modules.
+
+    Each compiled module is stored as MLIR bytecode in its own file under
+    `cache_dir`, named after its cache key. The cache can be shared between
+    processes: entries are written atomically, so a concurrent reader either
+    sees a complete entry or none at all.
+
+    When the total size of the entries exceeds `max_size_bytes`, the least
+    recently used entries are removed. Recency is tracked through the
+    modification time of each file, which is refreshed on every hit.
+
+    ```python
+    cache = torch_mlir.DiskCompileCache("/var/cache/torch-mlir")
+    module = torch_mlir.compile(model, example_args, cache=cache)
+    ```
+    """
+
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 max_size_bytes: int = 1 << 30):
+        """Create a cache stored in `cache_dir`.
+
+        Args:
+            cache_dir: The directory holding the cache entries. It is created
+                if it does not exist. Defaults to the `TORCH_MLIR_CACHE_DIR`
+                environment variable, or to `torch_mlir_cache` in the system
+                temporary directory.
+            max_size_bytes: The maximum total size of the entries.
+        """
+        super().__init__()
+        if cache_dir is None:
+            cache_dir = os.environ.get(
+                "TORCH_MLIR_CACHE_DIR",
+                os.path.join(tempfile.gettempdir(), "torch_mlir_cache"))
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _path_for_key(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + _CACHE_FILE_SUFFIX)
+
+    def get(self, key: str) -> Optional[ir.Module]:
+        path = self._path_for_key(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        try:
+            # The parser reports why it failed on stderr, which is of no
+            # interest to the user here.
+            with capture_stderr():
+                module = deserialize_module(data)
+        except Exception:
+            # The entry is truncated, corrupt or was written by an
+            # incompatible MLIR version. Drop it so that it gets rewritten.
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            self.misses += 1
+            return None
+        self.hits += 1
+        try:
+            # Mark the entry as the most recently used one.
+            os.utime(path)
+        except OSError:
+            # The entry might have been evicted by another process in the
+            # meantime, which is harmless since we already read it.
+            pass
+        return module
+
+    def put(self, key: str, module: ir.Module):
+        data = serialize_module(module)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, self._path_for_key(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._evict()
+
+    def _evict(self):
+        """Removes least recently used entries until the cache fits."""
+        entries = []
+        total_size = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.name.endswith(_CACHE_FILE_SUFFIX):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total_size += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            try:
+                os.unlink(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+    def clear(self):
+        """Removes all entries from the cache."""
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(_CACHE_FILE_SUFFIX):
+                    try:
+                        os.unlink(entry.path)
+                    except FileNotFoundError:
+                        pass
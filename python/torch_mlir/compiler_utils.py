@@ -3,13 +3,22 @@
 # SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
 # Also available under a BSD-style license. See LICENSE.
 
-from io import StringIO
+from contextlib import contextmanager
+from io import BytesIO, StringIO
+import gzip
+import json
 import os
 import sys
 import tempfile
+import threading
+import time
+import uuid
+from typing import Dict, List, NamedTuple, Optional
 
 from torch_mlir.passmanager import PassManager
-from torch_mlir.ir import StringAttr
+from torch_mlir._mlir_libs._torchMlir import add_pass_timer
+from torch_mlir.ir import Context, Module, StringAttr
+from torch_mlir.dialects import torch as torch_dialect
 
 
 def get_module_name_for_debug_dump(module):
@@ -22,56 +31,410 @@ def get_module_name_for_debug_dump(module):
     return StringAttr(module.operation.attributes["torch.debug_module_name"]).value
 
 
+def serialize_module(module: Module) -> bytes:
+    """Serializes `module` to MLIR bytecode."""
+    stream = BytesIO()
+    module.operation.write_bytecode(stream)
+    return stream.getvalue()
+
+
+def deserialize_module(data: bytes, context: Optional[Context] = None) -> Module:
+    """Parses a module previously produced by `serialize_module`.
+
+    If `context` is None, the module is parsed into a new context with all
+    the dialects that torch-mlir can produce registered.
+    """
+    if context is None:
+        context = Context()
+        torch_dialect.register_all_dialects(context)
+    return Module.parse(data, context=context)
+
+
+def save_module(module: Module, path: str):
+    """Saves `module` to `path` as MLIR bytecode.
+
+    Unlike the textual form, bytecode stores dense elements attributes and
+    resource blobs (such as weights) as raw binary data, so the file is
+    compact and much faster to load. The file is written atomically.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            module.operation.write_bytecode(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_module(path: str, context: Optional[Context] = None) -> Module:
+    """Loads a module saved by `save_module`.
+
+    Files in the textual MLIR format are accepted as well.
+    If `context` is None, the module is loaded into a new context with all
+    the dialects that torch-mlir can produce registered.
+    """
+    with open(path, "rb") as f:
+        return deserialize_module(f.read(), context)
+
+
+def clone_module(module: Module) -> Module:
+    """Creates a copy of `module` in the same context.
+
+    The copy is made by a round trip through MLIR bytecode, which is much
+    cheaper than printing and reparsing the textual form.
+    """
+    return deserialize_module(serialize_module(module), module.context)
+
+
+class _ThreadLocalStderr:
+    """A stand-in for `sys.stderr` that can be captured per thread.
+
+    Output written by a thread that is inside `capture_stderr` goes to that
+    thread's capture stream. All other output goes to the original stream.
+    """
+
+    def __init__(self, original):
+        self.original = original
+        self.local = threading.local()
+
+    def _stream(self):
+        return getattr(self.local, "stream", None) or self.original
+
+    def write(self, s):
+        return self._stream().write(s)
+
+    def flush(self):
+        return self._stream().flush()
+
+    def __getattr__(self, name):
+        return getattr(self._stream(), name)
+
+
+_stderr_lock = threading.Lock()
+_stderr_capture_count = 0
+
+
+@contextmanager
+def capture_stderr():
+    """Captures everything the current thread writes to `sys.stderr`.
+
+    Unlike swapping out `sys.stderr` directly, this is safe to use from
+    several threads at once, and it can be nested.
+
+    Yields:
+        A `StringIO` holding the captured output.
+    """
+    global _stderr_capture_count
+    with _stderr_lock:
+        if _stderr_capture_count == 0:
+            sys.stderr = _ThreadLocalStderr(sys.stderr)
+        _stderr_capture_count += 1
+        proxy = sys.stderr
+    previous_stream = getattr(proxy.local, "stream", None)
+    stream = StringIO()
+    proxy.local.stream = stream
+    try:
+        yield stream
+    finally:
+        proxy.local.stream = previous_stream
+        with _stderr_lock:
+            _stderr_capture_count -= 1
+            if _stderr_capture_count == 0:
+                sys.stderr = proxy.original
+
+
 class TorchMlirCompilerError(Exception):
     def __init__(self, value: str):
-        super().__init__()
+        super().__init__(value)
         self.value = value
 
     def __str__(self) -> str:
         return self.value
 
 
+class ReproStore:
+    """A directory holding the repro files of failed pipeline runs.
+
+    Each failure gets its own uniquely named file, which is written
+    atomically, so concurrent compiles never clobber each other's repros.
+    Once the files in the directory exceed `max_total_bytes`, the oldest ones
+    are removed. Repros larger than `compress_threshold_bytes` are gzipped.
+
+    By default, the settings are taken from the environment:
+    - `TORCH_MLIR_REPRO_DIR`: the directory. Defaults to `torch_mlir_repros`
+      in the system temporary directory.
+    - `TORCH_MLIR_REPRO_MAX_BYTES`: the size limit. Defaults to 256 MiB.
+    - `TORCH_MLIR_REPRO_COMPRESS_BYTES`: the compression threshold. By
+      default, repros are not compressed.
+    """
+
+    def __init__(self,
+                 root: Optional[str] = None,
+                 max_total_bytes: Optional[int] = None,
+                 compress_threshold_bytes: Optional[int] = None):
+        if root is None:
+            root = os.environ.get(
+                "TORCH_MLIR_REPRO_DIR",
+                os.path.join(tempfile.gettempdir(), "torch_mlir_repros"))
+        if max_total_bytes is None:
+            max_total_bytes = int(
+                os.environ.get("TORCH_MLIR_REPRO_MAX_BYTES", 256 << 20))
+        if compress_threshold_bytes is None and \
+                "TORCH_MLIR_REPRO_COMPRESS_BYTES" in os.environ:
+            compress_threshold_bytes = int(
+                os.environ["TORCH_MLIR_REPRO_COMPRESS_BYTES"])
+        self.root = root
+        self.max_total_bytes = max_total_bytes
+        self.compress_threshold_bytes = compress_threshold_bytes
+
+    def write(self, module_name: str, asm: str) -> str:
+        """Writes the repro `asm` for `module_name` to a new file.
+
+        Returns:
+            The path of the file, which ends in `.mlir.gz` if the repro was
+            compressed and in `.mlir` otherwise.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        data = asm.encode()
+        basename = f"{module_name}-{time.time_ns()}-{os.getpid()}-" \
+                   f"{uuid.uuid4().hex[:8]}.mlir"
+        if self.compress_threshold_bytes is not None and \
+                len(data) > self.compress_threshold_bytes:
+            data = gzip.compress(data)
+            basename += ".gz"
+        path = os.path.join(self.root, basename)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._evict(keep=path)
+        return path
+
+    def _evict(self, keep: str):
+        """Removes the oldest repros, other than `keep`, until they fit."""
+        entries = []
+        total_size = 0
+        with os.scandir(self.root) as it:
+            for entry in it:
+                if not entry.name.endswith((".mlir", ".mlir.gz")):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total_size += stat.st_size
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self.max_total_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
+
+
+_repro_store: Optional[ReproStore] = None
+
+
+def set_repro_store(store: Optional[ReproStore]):
+    """Sets where `run_pipeline_with_repro_report` writes repros.
+
+    If `store` is None, a `ReproStore` configured from the environment is
+    used.
+    """
+    global _repro_store
+    _repro_store = store
+
+
+class PassTiming(NamedTuple):
+    """The time spent in one pass of a pipeline."""
+    # The pass argument, prefixed with the ops it is nested under, e.g.
+    # `func.func/canonicalize`.
+    name: str
+    # The wall time in seconds spent in the pass, summed over its runs.
+    wall_time: float
+    # The number of times the pass ran as part of the pipeline, e.g. once per
+    # function for passes nested under `func.func`.
+    invocation_count: int
+
+
+class PassInvocation(NamedTuple):
+    """A single run of one pass of a pipeline."""
+    name: str
+    # The start time in seconds, relative to the start of the pipeline.
+    start: float
+    # The wall time in seconds.
+    duration: float
+    # The thread the pass ran on.
+    thread_id: int
+
+
+class PipelineTiming:
+    """The timing report of one run of `run_pipeline_with_repro_report`.
+
+    The times are recorded by instrumenting the pass manager, so the pipeline
+    runs exactly as it does without timing. Passes that run their own nested
+    pipelines dynamically, such as `torch-lower-to-backend-contract`, are
+    reported along with each pass of those pipelines. The time of the outer
+    pass includes that of the nested passes. Passes nested under an op run
+    once per op, possibly in parallel, so the times of all passes can add up
+    to more than `total_time`.
+    """
+
+    def __init__(self, description: str, pipeline: str):
+        self.description = description
+        self.pipeline = pipeline
+        self.invocations: List[PassInvocation] = []
+        # The wall time in seconds spent in the pipeline.
+        self.total_time = 0.0
+
+    @property
+    def passes(self) -> List[PassTiming]:
+        """The time spent in each pass, slowest first."""
+        wall_times: Dict[str, float] = {}
+        counts: Dict[str, int] = {}
+        for invocation in self.invocations:
+            wall_times[invocation.name] = \
+                wall_times.get(invocation.name, 0.0) + invocation.duration
+            counts[invocation.name] = counts.get(invocation.name, 0) + 1
+        timings = [PassTiming(name, wall_times[name], counts[name])
+                   for name in wall_times]
+        return sorted(timings, key=lambda t: t.wall_time, reverse=True)
+
+    def to_json(self) -> Dict:
+        return {
+            "description": self.description,
+            "pipeline": self.pipeline,
+            "total_time": self.total_time,
+            "passes": [timing._asdict() for timing in self.passes],
+        }
+
+    def write_json(self, path: str):
+        """Writes the per-pass summary to `path` as JSON."""
+        with open(path, "w") as f:
+            json.dump(self.to_json(), f, indent=2)
+
+    def write_chrome_trace(self, path: str):
+        """Writes each pass run to `path` in the Chrome trace event format.
+
+        The file can be viewed in `chrome://tracing` or Perfetto.
+        """
+        events = [{
+            "name": invocation.name,
+            "cat": self.description,
+            "ph": "X",
+            "ts": invocation.start * 1e6,
+            "dur": invocation.duration * 1e6,
+            "pid": os.getpid(),
+            "tid": invocation.thread_id,
+        } for invocation in self.invocations]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events}, f)
+
+    def __str__(self) -> str:
+        lines = [f"{self.description}: {self.total_time:.4f}s"]
+        for timing in self.passes:
+            lines.append(f"  {timing.wall_time:10.4f}s  "
+                         f"{timing.invocation_count:4}x  {timing.name}")
+        return "\n".join(lines)
+
+
+def _run_pipeline_with_timing(module, pm: PassManager, pipeline: str,
+                              description: str) -> PipelineTiming:
+    """Runs `pm`, timing each of its passes."""
+    timing = PipelineTiming(description, pipeline)
+    timer = add_pass_timer(pm)
+    start = time.perf_counter()
+    pm.run(module.operation)
+    timing.total_time = time.perf_counter() - start
+    timing.invocations = [
+        PassInvocation(*invocation) for invocation in timer.get_invocations()
+    ]
+    return timing
+
+
+def _write_timing_report(timing: PipelineTiming, module_name: str,
+                         report_dir: str):
+    """Writes `timing` to a uniquely named pair of files in `report_dir`."""
+    os.makedirs(report_dir, exist_ok=True)
+    fd, path = tempfile.mkstemp(prefix=module_name + "-", suffix=".json",
+                                dir=report_dir)
+    os.close(fd)
+    timing.write_json(path)
+    timing.write_chrome_trace(path[:-len(".json")] + ".trace.json")
+
+
 def run_pipeline_with_repro_report(module,
                                    pipeline: str,
-                                   description: str):
-    """Runs `pipeline` on `module`, with a nice repro report if it fails."""
+                                   description: str,
+                                   enable_timing: bool = False
+                                   ) -> Optional[PipelineTiming]:
+    """Runs `pipeline` on `module`, with a nice repro report if it fails.
+
+    If `enable_timing` is true, or the `TORCH_MLIR_PASS_TIMING_DIR`
+    environment variable is set, each pass of the pipeline is timed. Timing
+    does not change how the pipeline runs. When the environment variable is
+    set, the timings are also written to that directory, both as a JSON
+    summary and as a Chrome trace.
+
+    Returns:
+        A `PipelineTiming` if timing is enabled, otherwise None.
+    """
     module_name = get_module_name_for_debug_dump(module)
-    try:
-        original_stderr = sys.stderr
-        sys.stderr = StringIO()
-        asm_for_error_report = module.operation.get_asm(
-            large_elements_limit=10, enable_debug_info=True)
-        # Lower module in place to make it ready for compiler backends.
-        with module.context:
-            pm = PassManager.parse(pipeline)
-            pm.run(module.operation)
-    except Exception as e:
-        # TODO: More robust.
-        # - don't arbitrarily clutter up /tmp. When a test suite has many
-        #   tests, this can be a big disk cost (also, /tmp/ is frequently a
-        #   RAM fs, which increases worries about capacity).
-        # - don't have colliding filenames (hard to do without cluttering
-        #   up /tmp)
-        # - if we do have have colliding filenames, writes should at least
-        #   avoid being racy.
-        filename = os.path.join(tempfile.gettempdir(), module_name + ".mlir")
-        with open(filename, 'w') as f:
-            f.write(asm_for_error_report)
-        debug_options="-mlir-print-ir-after-all -mlir-disable-threading"
-        # Put something descriptive here even if description is empty.
-        description = description or f"{module_name} compile"
-
-        message = f"""\
-            {description} failed with the following diagnostics:
-            {sys.stderr.getvalue()}
-
-            python exception: {e}
-            
-            For Torch-MLIR developers, the error can be reproduced with:
-            $ torch-mlir-opt -pass-pipeline='{pipeline}' {filename}
-            Add '{debug_options}' to get the IR dump for debugging purpose.
-            """
-        trimmed_message = '\n'.join([m.lstrip() for m in message.split('\n')])
-        raise TorchMlirCompilerError(trimmed_message) from None
-    finally:
-        sys.stderr = original_stderr
+    timing_report_dir = os.environ.get("TORCH_MLIR_PASS_TIMING_DIR")
+    timing = None
+    # Keep a copy of the input to report if the pipeline fails. Cloning only
+    # copies the ops (attributes such as weights are uniqued in the context
+    # and shared), so unlike printing the module it is cheap, and the asm is
+    # only produced on failure.
+    module_before_pipeline = module.operation.clone()
+    with capture_stderr() as stderr:
+        try:
+            # Lower module in place to make it ready for compiler backends.
+            with module.context:
+                pm = PassManager.parse(pipeline)
+                if enable_timing or timing_report_dir:
+                    timing = _run_pipeline_with_timing(module, pm, pipeline,
+                                                       description)
+                else:
+                    pm.run(module.operation)
+        except Exception as e:
+            asm_for_error_report = module_before_pipeline.get_asm(
+                large_elements_limit=10, enable_debug_info=True)
+            repro_store = _repro_store or ReproStore()
+            filename = repro_store.write(module_name, asm_for_error_report)
+            if filename.endswith(".gz"):
+                repro_command = f"gunzip -c {filename} | " \
+                    f"torch-mlir-opt -pass-pipeline='{pipeline}' -"
+            else:
+                repro_command = \
+                    f"torch-mlir-opt -pass-pipeline='{pipeline}' {filename}"
+            debug_options="-mlir-print-ir-after-all -mlir-disable-threading"
+            # Put something descriptive here even if description is empty.
+            description = description or f"{module_name} compile"
+
+            message = f"""\
+                {description} failed with the following diagnostics:
+                {stderr.getvalue()}
+
+                python exception: {e}
+                
+                For Torch-MLIR developers, the error can be reproduced with:
+                $ {repro_command}
+                Add '{debug_options}' to get the IR dump for debugging purpose.
+                """
+            trimmed_message = '\n'.join([m.lstrip() for m in message.split('\n')])
+            raise TorchMlirCompilerError(trimmed_message) from None
+    if timing is not None and timing_report_dir:
+        _write_timing_report(timing, module_name, timing_report_dir)
+    return timing
@@ -33,6 +33,26 @@ struct ImportOptions {
   // In that case, the appropriate shape information is provided via the type
   // bound annotations on the function arguments instead.
   bool ignoreExistingTensorShapesAndDtypes = false;
+
+  // If this is set to true, then tensor literals are imported as
+  // DenseResourceElementsAttr blobs instead of DenseElementsAttr's.
+  //
+  // The blobs reference the storage of the imported tensors directly rather
+  // than copying it into the (uniqued, never freed) attribute storage of the
+  // MLIRContext, and keep those tensors alive for as long as the blobs are
+  // in use. This keeps the memory overhead of importing large models close to
+  // 1x. Note that this means that mutating a tensor in place after import is
+  // visible in the imported module.
+  bool importTensorsAsResources = false;
+
+  // If this is set to true, then tensors with identical dtype, shape and
+  // contents are imported as a single tensor literal, even if they do not
+  // share storage. This is common for constants duplicated by model surgery.
+  //
+  // Since the deduplicated tensors become the same object, this must only be
+  // set if none of them is mutated in place (which always holds when
+  // `assumeTensorsHaveValueSemantics` is set).
+  bool deduplicateIdenticalTensors = false;
 };
 } // namespace torch_mlir
 
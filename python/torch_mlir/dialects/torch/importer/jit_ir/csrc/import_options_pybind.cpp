@@ -20,5 +20,9 @@ void torch_mlir::initImportOptionsBindings(py::module &m) {
       .def_readwrite("assumeTensorsHaveValueSemantics",
                      &ImportOptions::assumeTensorsHaveValueSemantics)
       .def_readwrite("ignoreExistingTensorShapesAndDtypes",
-                     &ImportOptions::ignoreExistingTensorShapesAndDtypes);
+                     &ImportOptions::ignoreExistingTensorShapesAndDtypes)
+      .def_readwrite("importTensorsAsResources",
+                     &ImportOptions::importTensorsAsResources)
+      .def_readwrite("deduplicateIdenticalTensors",
+                     &ImportOptions::deduplicateIdenticalTensors);
 }
@@ -12,6 +12,8 @@
 #include "function_importer.h"
 #include "torch_to_mlir_utils.h"
 
+#include <chrono>
+#include <string_view>
 #include <unordered_map>
 
 #include "mlir_utils.h"
@@ -90,24 +92,34 @@ namespace {
 /// - at::StorageImpl which is a low-level buffer
 ///   - the address of the at::StorageImpl is the identity of the "storage".
 ///
-/// Multiple different tensors can share the same underlying storage. We
-/// currently import tensors by identity and emit errors in the case of tensors
-/// with different identity but sharing the same storage. This is done because
-/// correctly modeling the many ways that tensors can overlap and alias when
-/// they share storage is difficult. Example hard cases are weird
-/// strides/offsets that overlap, and even cases where the data types mismatch
-/// (PyTorch allows this!).
+/// Multiple different tensors can share the same underlying storage. Tensors
+/// with different identity that view exactly the same elements of a storage
+/// (same dtype, sizes, strides and storage offset), such as tied weights, are
+/// imported as the same value. We emit errors for all other tensors sharing
+/// storage with an already imported tensor. This is done because correctly
+/// modeling the many ways that tensors can overlap and alias when they share
+/// storage is difficult. Example hard cases are weird strides/offsets that
+/// overlap, and even cases where the data types mismatch (PyTorch allows
+/// this!).
+///
+/// If `ImportOptions::deduplicateIdenticalTensors` is set, tensors that have
+/// different storage but identical contents are imported as the same value
+/// as well.
 class IValueImporter {
 public:
   IValueImporter(MlirBlock importBlock, MlirContext context,
-                 ClassAnnotator &annotator, const ImportOptions &importOptions)
+                 ClassAnnotator &annotator, const ImportOptions &importOptions,
+                 const ImportProgressCallback &progressCallback)
       : importBlock(importBlock), context(context), annotator(annotator),
-        importOptions(importOptions) {}
+        importOptions(importOptions), progressCallback(progressCallback),
+        startTime(std::chrono::steady_clock::now()) {}
 
   MlirValue importIValue(c10::IValue ivalue);
 
 private:
   MlirValue rawImportIValue(c10::IValue ivalue);
+  c10::optional<MlirValue> findEquivalentTensor(const at::Tensor &tensor);
+  void reportProgress();
   MlirValue importTensor(c10::IValue ivalue);
   MlirValue importModule(torch::jit::Module jitModule);
   void importMethod(torch::jit::Function *function, MlirBlock classTypeBody,
@@ -119,6 +131,11 @@ private:
   MlirContext context;
   ClassAnnotator &annotator;
   const ImportOptions &importOptions;
+  const ImportProgressCallback &progressCallback;
+
+  // Progress statistics, reported through `progressCallback`.
+  ImportProgress progress;
+  std::chrono::steady_clock::time_point startTime;
 
   // Map tracking already-imported values.
   std::unordered_map<c10::IValue, MlirValue, IValueHasher, IValueEq> valueMap;
@@ -131,8 +148,13 @@ private:
   // `__torch__`).
   torch::jit::CompilationUnit *compilationUnit = nullptr;
 
-  // Used to detect potentially aliasing tensors.
-  std::unordered_set<c10::StorageImpl *> seenStorageImpls;
+  // The tensors imported so far, keyed by their storage. Used to detect
+  // potentially aliasing tensors.
+  std::unordered_map<c10::StorageImpl *, std::vector<at::Tensor>>
+      importedTensorsByStorage;
+  // The tensors imported so far, keyed by a hash of their contents. Only
+  // populated if `importOptions.deduplicateIdenticalTensors` is set.
+  std::unordered_map<size_t, std::vector<at::Tensor>> importedTensorsByContents;
   // The set of ClassType's that have already been imported.
   //
   // ClassType's are referenced via their `classType->name()->qualifiedName()`
@@ -213,6 +235,8 @@ MlirValue IValueImporter::importModule(torch::jit::Module currentModule) {
         toMlirNamedAttribute(
             "name", mlirStringAttrGet(
                         context, toMlirStringRef(classAttribute.getName()))));
+    progress.slotsImported++;
+    reportProgress();
     attributeNameStack.pop_back();
   }
 
@@ -224,24 +248,26 @@ MlirValue IValueImporter::importModule(torch::jit::Module currentModule) {
   return mlirOperationGetResult(nnModule, 0);
 }
 
+void IValueImporter::reportProgress() {
+  if (!progressCallback)
+    return;
+  progress.elapsedSeconds = std::chrono::duration<double>(
+                                std::chrono::steady_clock::now() - startTime)
+                                .count();
+  progress.path = c10::QualifiedName(attributeNameStack).qualifiedName();
+  progressCallback(progress);
+}
+
 MlirValue IValueImporter::importIValue(c10::IValue ivalue) {
   auto it = valueMap.find(ivalue);
   if (it != valueMap.end()) {
     return it->second;
   }
-  // Reject potentially aliased tensors.
   if (ivalue.isTensor()) {
-    c10::StorageImpl *storageImpl =
-        ivalue.toTensor().storage().unsafeGetStorageImpl();
-    if (!seenStorageImpls.insert(storageImpl).second) {
-      std::stringstream msg;
-      msg << "Unhandled tensor that shares storage with another tensor.";
-      if (rootModuleName) {
-        msg << "\nFound at path '<root>."
-            << c10::QualifiedName(attributeNameStack).qualifiedName()
-            << "' from root object '" << *rootModuleName << "'";
-      }
-      throw std::invalid_argument(msg.str());
+    if (c10::optional<MlirValue> value =
+            findEquivalentTensor(ivalue.toTensor())) {
+      valueMap[ivalue] = *value;
+      return *value;
     }
   }
   MlirValue value = rawImportIValue(ivalue);
@@ -249,6 +275,66 @@ MlirValue IValueImporter::importIValue(c10::IValue ivalue) {
   return value;
 }
 
+// Returns true if `lhs` and `rhs` hold the same elements with the same
+// quantization parameters, given that their data is the same.
+static bool haveSameMetadata(const at::Tensor &lhs, const at::Tensor &rhs) {
+  if (lhs.scalar_type() != rhs.scalar_type() || lhs.sizes() != rhs.sizes())
+    return false;
+  if (!lhs.is_quantized())
+    return true;
+  return lhs.qscheme() == c10::kPerTensorAffine &&
+         rhs.qscheme() == c10::kPerTensorAffine &&
+         lhs.q_scale() == rhs.q_scale() &&
+         lhs.q_zero_point() == rhs.q_zero_point();
+}
+
+// Hashes the raw data of `tensor`. Tensors with the same data but different
+// metadata collide, which `haveSameMetadata` sorts out.
+static size_t hashTensorContents(const at::Tensor &tensor) {
+  at::Tensor contiguous = tensor.cpu().contiguous();
+  return std::hash<std::string_view>()(std::string_view(
+      static_cast<const char *>(contiguous.data_ptr()), contiguous.nbytes()));
+}
+
+c10::optional<MlirValue>
+IValueImporter::findEquivalentTensor(const at::Tensor &tensor) {
+  // Tensors viewing exactly the same elements of the same storage alias each
+  // other completely, so they can be imported as the same value. Reject all
+  // other potentially aliased tensors.
+  c10::StorageImpl *storageImpl = tensor.storage().unsafeGetStorageImpl();
+  std::vector<at::Tensor> &sameStorage = importedTensorsByStorage[storageImpl];
+  for (const at::Tensor &other : sameStorage) {
+    if (haveSameMetadata(tensor, other) &&
+        tensor.strides() == other.strides() &&
+        tensor.storage_offset() == other.storage_offset())
+      return valueMap.at(c10::IValue(other));
+  }
+  if (!sameStorage.empty()) {
+    std::stringstream msg;
+    msg << "Unhandled tensor that shares storage with another tensor.";
+    if (rootModuleName) {
+      msg << "\nFound at path '<root>."
+          << c10::QualifiedName(attributeNameStack).qualifiedName()
+          << "' from root object '" << *rootModuleName << "'";
+    }
+    throw std::invalid_argument(msg.str());
+  }
+  sameStorage.push_back(tensor);
+
+  if (!importOptions.deduplicateIdenticalTensors)
+    return c10::nullopt;
+  std::vector<at::Tensor> &sameHash =
+      importedTensorsByContents[hashTensorContents(tensor)];
+  for (const at::Tensor &other : sameHash) {
+    if (haveSameMetadata(tensor, other) &&
+        at::equal(tensor.is_quantized() ? tensor.int_repr() : tensor,
+                  other.is_quantized() ? other.int_repr() : other))
+      return valueMap.at(c10::IValue(other));
+  }
+  sameHash.push_back(tensor);
+  return c10::nullopt;
+}
+
 MlirValue IValueImporter::rawImportIValue(c10::IValue ivalue) {
   // TODO: Can we do better?
   MlirLocation loc = mlirLocationUnknownGet(context);
@@ -377,8 +463,21 @@ MlirValue IValueImporter::importTensor(c10::IValue ivalue) {
   MlirLocation loc = mlirLocationUnknownGet(context);
 
   // Import the bulk tensor representation.
-  at::Tensor tensor = ivalue.toTensor().contiguous();
-  MlirAttribute denseElements = convertTensorToMlirElementsAttr(tensor, loc);
+  at::Tensor tensor = ivalue.toTensor();
+  progress.tensorBytesImported += tensor.nbytes();
+  MlirAttribute denseElements;
+  if (importOptions.importTensorsAsResources) {
+    // Name the blob after the attribute holding the tensor, which makes the
+    // printed resources easier to match up with the module. Name collisions
+    // are resolved by MLIR.
+    std::string name = "torch_tensor";
+    for (const std::string &attributeName : attributeNameStack)
+      name += "." + attributeName;
+    denseElements =
+        convertTensorToMlirDenseResourceElementsAttr(tensor, name, loc);
+  } else {
+    denseElements = convertTensorToMlirElementsAttr(tensor, loc);
+  }
 
   MlirOperation tensorOp;
 
@@ -592,13 +691,15 @@ void IValueImporter::importCompilationUnit(torch::jit::CompilationUnit *cu) {
   }
 }
 
-MlirValue torch_mlir::importIValue(c10::IValue ivalue, MlirBlock block,
-                                   MlirContext context,
-                                   ClassAnnotator &annotator,
-                                   const ImportOptions &importOptions) {
+MlirValue
+torch_mlir::importIValue(c10::IValue ivalue, MlirBlock block,
+                         MlirContext context, ClassAnnotator &annotator,
+                         const ImportOptions &importOptions,
+                         const ImportProgressCallback &progressCallback) {
   // When debugging module importing, it can be useful to dump as so:
   // if (ivalue.isModule())
   //   ivalue.toModule().dump(true, false, false);
-  IValueImporter importer(block, context, annotator, importOptions);
+  IValueImporter importer(block, context, annotator, importOptions,
+                          progressCallback);
   return importer.importIValue(ivalue);
 }
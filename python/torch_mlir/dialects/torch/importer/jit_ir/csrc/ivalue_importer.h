@@ -10,7 +10,9 @@
 #ifndef TORCHMLIRJITIRIMPORTER_CSRC_IVALUE_IMPORTER_H
 #define TORCHMLIRJITIRIMPORTER_CSRC_IVALUE_IMPORTER_H
 
+#include <functional>
 #include <memory>
+#include <string>
 
 #include "class_annotator.h"
 #include "import_options.h"
@@ -23,11 +25,30 @@
 
 namespace torch_mlir {
 
+/// The progress of an IValue import, as reported to an
+/// `ImportProgressCallback`.
+struct ImportProgress {
+  // The number of module slots imported so far.
+  int64_t slotsImported = 0;
+  // The total size in bytes of the tensors imported so far.
+  int64_t tensorBytesImported = 0;
+  // The time since the import started.
+  double elapsedSeconds = 0;
+  // The path from the root object to the slot that was just imported, e.g.
+  // "encoder.layers.0.weight".
+  std::string path;
+};
+
+/// Called after each module slot is imported. Throwing from the callback
+/// cancels the import.
+using ImportProgressCallback = std::function<void(const ImportProgress &)>;
+
 /// Main entry-point for importing torch IValue's .
 /// Recursively imports `ivalue`, inserting operations at the end of `block`.
 MlirValue importIValue(c10::IValue ivalue, MlirBlock block, MlirContext context,
                        ClassAnnotator &annotator,
-                       const ImportOptions &importOptions);
+                       const ImportOptions &importOptions,
+                       const ImportProgressCallback &progressCallback = {});
 
 } // namespace torch_mlir
 
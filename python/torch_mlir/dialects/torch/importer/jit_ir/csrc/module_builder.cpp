@@ -82,6 +82,9 @@ static void printDiagnostic(MlirDiagnostic diagnostic) {
     ssp->write(s.data, s.length);
   };
   mlirDiagnosticPrint(diagnostic, stringCallback, static_cast<void *>(&ss));
+  // Diagnostics can be emitted while the GIL is released, e.g. during
+  // `importModule`.
+  py::gil_scoped_acquire acquire;
   // Use pybind11's print:
   // https://pybind11.readthedocs.io/en/stable/advanced/pycpp/utilities.html
   py::print(ss.str(),
@@ -140,7 +143,8 @@ ModuleBuilder::importFunction(torch::jit::StrongFunctionPtr function,
 
 void ModuleBuilder::importModule(torch::jit::Module jitModule,
                                  py::object maybeClassAnnotator,
-                                 py::object maybeImportOptions) {
+                                 py::object maybeImportOptions,
+                                 py::object maybeProgressCallback) {
   ClassAnnotator dummyAnnotator;
   ClassAnnotator *classAnnotator = &dummyAnnotator;
   if (!maybeClassAnnotator.is_none()) {
@@ -174,8 +178,25 @@ void ModuleBuilder::importModule(torch::jit::Module jitModule,
   mlirOperationSetAttributeByName(mlirModuleGetOperation(module),
                                   toMlirStringRef("torch.debug_module_name"),
                                   debugModuleNameAttr);
+
+  ImportProgressCallback progressCallback;
+  if (!maybeProgressCallback.is_none()) {
+    progressCallback = [&](const ImportProgress &progress) {
+      py::gil_scoped_acquire acquire;
+      // Give Python a chance to handle e.g. KeyboardInterrupt, which cancels
+      // the import like an exception raised by the callback does.
+      if (PyErr_CheckSignals() != 0)
+        throw py::error_already_set();
+      maybeProgressCallback(progress);
+    };
+  }
+
+  // The import does not touch any Python objects, so release the GIL to let
+  // other Python threads run while importing large modules.
+  py::gil_scoped_release release;
   importIValue(jitModule._ivalue(), mlirModuleGetBody(module),
-               mlirModuleGetContext(module), *classAnnotator, importOptions);
+               mlirModuleGetContext(module), *classAnnotator, importOptions,
+               progressCallback);
 }
 
 MlirBlock ModuleBuilder::getBodyBlock() {
@@ -192,5 +213,13 @@ void ModuleBuilder::bind(py::module &m) {
            py::arg("importOptions") = py::none())
       .def("import_module", &ModuleBuilder::importModule, py::arg("module"),
            py::arg("classAnnotator") = py::none(),
-           py::arg("importOptions") = py::none());
+           py::arg("importOptions") = py::none(),
+           py::arg("progressCallback") = py::none());
+
+  py::class_<ImportProgress>(m, "ImportProgress")
+      .def_readonly("slotsImported", &ImportProgress::slotsImported)
+      .def_readonly("tensorBytesImported",
+                    &ImportProgress::tensorBytesImported)
+      .def_readonly("elapsedSeconds", &ImportProgress::elapsedSeconds)
+      .def_readonly("path", &ImportProgress::path);
 }
@@ -45,9 +45,15 @@ public:
   // Imports a torch::jit::Module into the current module, using the
   // annotations, if not none, provided in `maybeClassAnnotator` which should be
   // a ClassAnnotator.
+  //
+  // The GIL is released during the import. If `maybeProgressCallback` is not
+  // none, it is called with an ImportProgress after each module slot is
+  // imported. Raising an exception from it cancels the import, leaving the
+  // current module partially populated.
   void importModule(torch::jit::Module jitModule,
                     py::object maybeClassAnnotator,
-                    py::object maybeImportOptions);
+                    py::object maybeImportOptions,
+                    py::object maybeProgressCallback);
 
 private:
   MlirBlock getBodyBlock();
@@ -289,19 +289,13 @@ torch_mlir::getFunctionTypeFromSchema(MlirContext context,
                              outputTypes.size(), outputTypes.data());
 }
 
-MlirAttribute torch_mlir::convertTensorToMlirElementsAttr(at::Tensor tensor,
-                                                          MlirLocation loc) {
-  using at::ScalarType;
-
-  auto throwUnsupportedTensorError = [&]() {
-    std::stringstream msg;
-    msg << "Unsupported import tensor type: " << tensor;
-    throw std::invalid_argument(msg.str());
-  };
-
-  // Get a C-contiguous form as we can bulk-load that into a DenseElementsAttr.
-  if (!tensor.is_contiguous())
-    tensor = tensor.contiguous();
+// Gets a C-contiguous CPU form of `tensor` along with the ranked tensor type
+// of the attribute holding its data.
+static std::pair<at::Tensor, MlirType>
+getContiguousTensorAndShapedType(at::Tensor tensor, MlirLocation loc) {
+  // Get a C-contiguous form as we can bulk-load that into an attribute. Both
+  // calls are no-ops for tensors that are already contiguous and on the CPU.
+  tensor = tensor.cpu().contiguous();
 
   // The flat number of bytes throws an exception for tensors that are not
   // dense and accessible as such.
@@ -320,14 +314,30 @@ MlirAttribute torch_mlir::convertTensorToMlirElementsAttr(at::Tensor tensor,
   MlirType shapedType = mlirRankedTensorTypeGetChecked(
       loc, shape.size(), shape.data(), elementType, {nullptr});
   if (mlirTypeIsNull(shapedType)) {
-    throwUnsupportedTensorError();
+    std::stringstream msg;
+    msg << "Unsupported import tensor type: " << tensor;
+    throw std::invalid_argument(msg.str());
   }
+  return {tensor, shapedType};
+}
+
+MlirAttribute torch_mlir::convertTensorToMlirElementsAttr(at::Tensor tensor,
+                                                          MlirLocation loc) {
+  using at::ScalarType;
+
+  auto throwUnsupportedTensorError = [&]() {
+    std::stringstream msg;
+    msg << "Unsupported import tensor type: " << tensor;
+    throw std::invalid_argument(msg.str());
+  };
+
+  MlirType shapedType;
+  std::tie(tensor, shapedType) = getContiguousTensorAndShapedType(tensor, loc);
 
   // Import DenseElementsAttr data.
   // TODO: More import formats in C-API.
   auto numElements = tensor.numel();
-  auto tensor_cpu = tensor.cpu().contiguous();
-  auto tensorData = tensor_cpu.data_ptr();
+  auto tensorData = tensor.data_ptr();
   switch (tensor.scalar_type()) {
   case ScalarType::Int:
     return mlirDenseElementsAttrInt32Get(
@@ -346,13 +356,18 @@ MlirAttribute torch_mlir::convertTensorToMlirElementsAttr(at::Tensor tensor,
         shapedType, numElements, static_cast<const double *>(tensorData));
     break;
   case ScalarType::Bool: {
-    // TODO: The signature of `mlirDenseElementsAttrBoolGet` should be changed
-    // upstream to take in a `const bool *` rather than a `const int *` to avoid
-    // the unnecessary copying into an array four times as large.
-    const int8_t *elements = static_cast<const int8_t *>(tensorData);
-    std::vector<int> tensorDataVector(elements, elements + numElements);
-    return mlirDenseElementsAttrBoolGet(shapedType, numElements,
-                                        tensorDataVector.data());
+    // `mlirDenseElementsAttrBoolGet` takes one `int` per element, which would
+    // need a temporary array four times as large as the tensor. Instead, pack
+    // the elements into the bit-packed raw buffer format that DenseElementsAttr
+    // uses to store i1 elements.
+    const uint8_t *elements = static_cast<const uint8_t *>(tensorData);
+    std::vector<uint8_t> packedElements((numElements + 7) / 8, 0);
+    for (int64_t i = 0; i < numElements; ++i) {
+      if (elements[i])
+        packedElements[i / 8] |= 1 << (i % 8);
+    }
+    return mlirDenseElementsAttrRawBufferGet(
+        shapedType, packedElements.size(), packedElements.data());
   } break;
   case ScalarType::QInt8:
     return mlirDenseElementsAttrInt8Get(
@@ -379,6 +394,24 @@ MlirAttribute torch_mlir::convertTensorToMlirElementsAttr(at::Tensor tensor,
   return {nullptr}; // Unreachable.
 }
 
+MlirAttribute torch_mlir::convertTensorToMlirDenseResourceElementsAttr(
+    at::Tensor tensor, const std::string &name, MlirLocation loc) {
+  MlirType shapedType;
+  std::tie(tensor, shapedType) = getContiguousTensorAndShapedType(tensor, loc);
+
+  // The blob references the tensor data directly. A heap-allocated reference to
+  // the tensor keeps its storage alive until MLIR releases the blob, at which
+  // point the deleter drops that reference.
+  auto *owner = new at::Tensor(tensor);
+  auto deleter = [](void *userData, const void *data, size_t size,
+                    size_t align) {
+    delete static_cast<at::Tensor *>(userData);
+  };
+  return mlirUnmanagedDenseResourceElementsAttrGet(
+      shapedType, toMlirStringRef(name), owner->data_ptr(), owner->nbytes(),
+      owner->element_size(), /*dataIsMutable=*/false, deleter, owner);
+}
+
 MlirAttribute torch_mlir::importAttribute(MlirLocation loc,
                                           torch::jit::Node *node,
                                           c10::Symbol symbol) {
@@ -59,6 +59,16 @@ MlirType getFunctionTypeFromSchema(MlirContext context,
 MlirAttribute convertTensorToMlirElementsAttr(at::Tensor tensor,
                                               MlirLocation loc);
 
+/// Creates a DenseResourceElementsAttr named `name` that holds the same values
+/// as `tensor`.
+///
+/// The data of CPU tensors is not copied: the attribute references the tensor
+/// storage and keeps it alive until the attribute's blob is released.
+MlirAttribute
+convertTensorToMlirDenseResourceElementsAttr(at::Tensor tensor,
+                                             const std::string &name,
+                                             MlirLocation loc);
+
 MlirAttribute importAttribute(MlirLocation loc, torch::jit::Node *node,
                               c10::Symbol symbol);
 
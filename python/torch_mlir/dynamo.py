@@ -3,7 +3,12 @@
 # SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
 # Also available under a BSD-style license. See LICENSE.
 
-from typing import List
+import collections
+import concurrent.futures
+import copy
+import threading
+import time
+from typing import List, Optional
 
 import torch
 from torch._functorch.compile_utils import strip_overloads
@@ -11,6 +16,8 @@ from torch._decomp import get_decompositions
 from torch._dynamo.backends.common import aot_autograd
 import functorch
 
+from torch_mlir.compile_cache import compute_fx_graph_hash
+
 import warnings
 # https://github.com/pytorch/pytorch/issues/89064
 warnings.filterwarnings("ignore", module="torch.jit._check")
@@ -112,25 +119,173 @@ def _adjust_calling_convention(gm: torch.fx.GraphModule) -> bool:
     return did_unwrap_single_element, did_convert_list_to_tuple
 
 
-def make_simple_dynamo_backend(user_backend):
+class BackgroundCompiler:
+    """Compiles graphs for `make_simple_dynamo_backend` on worker threads.
+
+    When a backend made by `make_simple_dynamo_backend` is given a
+    `BackgroundCompiler`, it does not block on the user backend when it
+    receives a new graph. Instead, the graph is compiled on a worker thread,
+    and the returned callable runs the graph eagerly until the compiled
+    callable is ready, at which point it switches over to it. If the
+    compilation fails, a warning is issued and the graph keeps running
+    eagerly.
+
+    The compiler keeps counts of the `pending_compiles`, `completed_compiles`
+    and `failed_compiles`, as well as of the `fallback_calls` that ran
+    eagerly and the `fallback_seconds` spent in them.
+
+    ```python
+    compiler = BackgroundCompiler()
+    backend = make_simple_dynamo_backend(my_backend,
+                                         background_compiler=compiler)
+    ...
+    print(compiler.pending_compiles, compiler.fallback_seconds)
+    ```
+    """
+
+    def __init__(self, max_workers: int = 1):
+        """Create a compiler running at most `max_workers` compiles at once."""
+        self.pending_compiles = 0
+        self.completed_compiles = 0
+        self.failed_compiles = 0
+        self.fallback_calls = 0
+        self.fallback_seconds = 0.0
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="torch-mlir-compile")
+        self._futures = set()
+        self._lock = threading.Lock()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits until the pending compiles are done.
+
+        Returns:
+            Whether all pending compiles were done before `timeout` seconds
+            elapsed.
+        """
+        with self._lock:
+            futures = list(self._futures)
+        _, not_done = concurrent.futures.wait(futures, timeout=timeout)
+        return not not_done
+
+    def shutdown(self, wait: bool = True):
+        """Stops accepting new compiles, and optionally waits for pending ones.
+
+        Graphs that are still compiling keep running eagerly until they are
+        done.
+        """
+        self._executor.shutdown(wait=wait)
+
+    def _compile_with_fallback(self, user_backend,
+                               gm: torch.fx.GraphModule,
+                               example_inputs: List[torch.Tensor]):
+        """Starts compiling `gm` with `user_backend` on a worker thread.
+
+        Returns:
+            A callable that runs `gm` eagerly until the compiled callable is
+            ready, and the compiled callable afterwards.
+        """
+        # The user backend is free to modify `gm`, so the eager fallback runs
+        # a copy of its graph instead.
+        eager_gm = torch.fx.GraphModule(gm, copy.deepcopy(gm.graph))
+        compiled_callable = None
+
+        def compile_graph():
+            nonlocal compiled_callable
+            try:
+                result = user_backend(gm, example_inputs)
+            except Exception as e:
+                with self._lock:
+                    self.pending_compiles -= 1
+                    self.failed_compiles += 1
+                warnings.warn("Compiling a graph in the background failed, "
+                              f"it will keep running eagerly: {e}")
+                raise
+            # Rebinding the variable is atomic, so concurrent callers either
+            # see the compiled callable or keep falling back.
+            compiled_callable = result
+            with self._lock:
+                self.pending_compiles -= 1
+                self.completed_compiles += 1
+
+        def discard_future(future):
+            with self._lock:
+                self._futures.discard(future)
+
+        with self._lock:
+            self.pending_compiles += 1
+            future = self._executor.submit(compile_graph)
+            self._futures.add(future)
+        future.add_done_callback(discard_future)
+
+        def callable_with_fallback(*inputs):
+            if compiled_callable is not None:
+                return compiled_callable(*inputs)
+            start = time.perf_counter()
+            result = eager_gm(*inputs)
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.fallback_calls += 1
+                self.fallback_seconds += elapsed
+            return result
+        return callable_with_fallback
+
+
+def make_simple_dynamo_backend(
+        user_backend,
+        reuse_compiled_graphs: bool = False,
+        max_compiled_graphs: int = 64,
+        background_compiler: Optional[BackgroundCompiler] = None):
     """Wrapper for functions intended to be used as TorchDynamo backends.
 
     This function simplifies a few of the steps that are required to make
     TorchDynamo work with Torch-MLIR.
 
+    Graph breaks and guard failures often hand the backend graphs that are
+    structurally identical to ones it has already compiled. With
+    `reuse_compiled_graphs`, the returned backend keeps the callable produced
+    for each graph, keyed by `compute_fx_graph_hash`, and reuses it for
+    identical graphs instead of calling `user_backend` again.
+
     Args:
         user_backend: A function with the signature used by ordinary
             TorchDynamo backends. But the torch.fx.GraphModule passed to it
             will be normalized for consumption by `torch_mlir.compile`.
+        reuse_compiled_graphs: Whether to reuse the callables produced for
+            structurally identical graphs.
+        max_compiled_graphs: The number of callables kept for reuse. When
+            more graphs are compiled, the least recently used callable is
+            dropped.
+        background_compiler: If specified, new graphs are compiled on the
+            worker threads of this `BackgroundCompiler` and run eagerly in
+            the meantime, instead of blocking the first call on the
+            compilation.
     Returns:
         A function with the signature used by TorchDynamo backends.
     """
+    compiled_graphs = collections.OrderedDict()
+    compiled_graphs_lock = threading.Lock()
+
     def wrapper_backend(gm: torch.fx.GraphModule,
                         example_inputs: List[torch.Tensor]):
+        # The hash is computed before the graph is normalized below, so that
+        # it also covers the original calling convention.
+        graph_hash = None
+        if reuse_compiled_graphs:
+            graph_hash = compute_fx_graph_hash(gm)
+            with compiled_graphs_lock:
+                compiled_callable = compiled_graphs.get(graph_hash)
+                if compiled_callable is not None:
+                    compiled_graphs.move_to_end(graph_hash)
+                    return compiled_callable
+
         did_unwrap_single_element, did_convert_list_to_tuple = \
             _adjust_calling_convention(gm)
         strip_overloads(gm)
-        user_callable = user_backend(gm, example_inputs)
+        if background_compiler is None:
+            user_callable = user_backend(gm, example_inputs)
+        else:
+            user_callable = background_compiler._compile_with_fallback(
+                user_backend, gm, example_inputs)
 
         # TODO: Have a consistent story about the boxed calling convention.
         # (for more details on this remove this decorator and look at the warning)
@@ -143,6 +298,11 @@ def make_simple_dynamo_backend(user_backend):
             if did_convert_list_to_tuple:
                 result = list(result)
             return result
+        if graph_hash is not None:
+            with compiled_graphs_lock:
+                compiled_graphs[graph_hash] = dynamo_callable
+                while len(compiled_graphs) > max_compiled_graphs:
+                    compiled_graphs.popitem(last=False)
         return dynamo_callable
     return aot_autograd(fw_compiler=wrapper_backend,
                         decompositions=_get_decomposition_table)
@@ -10,13 +10,13 @@ import torch_mlir
 
 from torch_mlir_e2e_test.linalg_on_tensors_backends.abc import LinalgOnTensorsBackend
 from torch_mlir_e2e_test.framework import TestConfig, Trace, TraceItem
-from torch_mlir_e2e_test.utils import convert_annotations_to_placeholders
-
-from .utils import (
-    recursively_convert_to_numpy,
-    recursively_convert_from_numpy,
+from torch_mlir_e2e_test.utils import (
+    convert_annotations_to_placeholders,
+    roundtrip_through_bytecode,
 )
 
+from .utils import recursively_convert_from_numpy
+
 
 class LinalgOnTensorsBackendTestConfig(TestConfig):
     """Base class for TestConfig's that are implemented with linalg-on-tensors.
@@ -24,15 +24,18 @@ class LinalgOnTensorsBackendTestConfig(TestConfig):
     This class handles all the common lowering that torch-mlir does before
     reaching the linalg-on-tensors abstraction level.
     """
-    def __init__(self, backend: LinalgOnTensorsBackend):
+    def __init__(self, backend: LinalgOnTensorsBackend, roundtrip_bytecode: bool = False):
         super().__init__()
         self.backend = backend
+        self.roundtrip_bytecode = roundtrip_bytecode
 
     def compile(self, program: torch.nn.Module) -> Any:
         example_args = convert_annotations_to_placeholders(program.forward)
         module = torch_mlir.compile(
             program, example_args, output_type="linalg-on-tensors")
 
+        if self.roundtrip_bytecode:
+            module = roundtrip_through_bytecode(module)
         return self.backend.compile(module)
 
 
@@ -41,8 +44,9 @@ class LinalgOnTensorsBackendTestConfig(TestConfig):
         backend_module = self.backend.load(artifact)
         result: Trace = []
         for item in trace:
-            numpy_inputs = recursively_convert_to_numpy(item.inputs)
-            outputs = getattr(backend_module, item.symbol)(*numpy_inputs)
+            # The backend reads the tensors' buffers directly, so there is no
+            # need to convert them to numpy first.
+            outputs = getattr(backend_module, item.symbol)(*item.inputs)
             output = recursively_convert_from_numpy(outputs)
             result.append(
                 TraceItem(symbol=item.symbol,
@@ -24,11 +24,10 @@ from torch_mlir import (
     run_pipeline_with_repro_report,
     _lower_mlir_module,
     _canon_extra_library,
+    CompileCache,
+    InMemoryCompileCache,
 )
-from torch_mlir_e2e_test.configs.utils import (
-    recursively_convert_to_numpy,
-    recursively_convert_from_numpy,
-)
+from torch_mlir.compile_cache import compute_fx_graph_cache_key
 from torch_mlir_e2e_test.framework import TestConfig, Trace, TraceItem
 
 
@@ -37,6 +36,8 @@ def refine_result_type(_result):
         return tuple(refine_result_type(x) for x in _result)
     elif isinstance(_result, np.ndarray):
         return torch.from_numpy(_result)
+    elif isinstance(_result, torch.Tensor):
+        return _result
     elif isinstance(_result, (bool, int, float)):
         return _result
     else:
@@ -61,12 +62,15 @@ def jit(
     backend_legal_ops: Optional[Sequence[str]] = None,
     extra_library=None,
     verbose: bool = False,
+    cache: Optional[CompileCache] = None,
 ):
     if extra_library is None:
         extra_library = []
     import torch._dynamo as dynamo
 
     mlir_module = None
+    cache_key = None
+    cached_module = None
 
     extra_library_file_name = _canon_extra_library(extra_library)
     output_type = OutputType.get(output_type)
@@ -87,8 +91,18 @@ def jit(
         # way of differentiating between the two.
         assert not _returns_empty_tuple(gm), "encountered graph that does not return anything"
 
-        nonlocal mlir_module
+        nonlocal mlir_module, cache_key, cached_module
         *_, model_name, nth_graph = get_aot_compilation_context()
+        if cache is not None:
+            # Structurally identical graphs produce the same module, so look
+            # the result up before paying for the import and the lowering.
+            cache_key = compute_fx_graph_cache_key(gm, model_name,
+                                                   output_type.value,
+                                                   backend_legal_ops,
+                                                   extra_library)
+            cached_module = cache.get(cache_key)
+            if cached_module is not None:
+                return gm
         mlir_module = import_fx_graph_as_func(gm.graph, model_name)
         return gm
 
@@ -102,6 +116,8 @@ def jit(
             lambda method, *inputs: method(*inputs))
         dynamo_f(lambda *inputs: model(*[x.clone() for x in inputs]),
                  *example_args)
+        if cached_module is not None:
+            return cached_module
         option_string = ("{backend-legal-ops=" + ",".join(backend_legal_ops) +
                          " extra-library=" + extra_library_file_name + "}")
         assert mlir_module is not None
@@ -112,7 +128,10 @@ def jit(
             "Lowering TorchFX IR -> Torch Backend IR",
         )
 
-    return _lower_mlir_module(verbose, output_type, mlir_module)
+    mlir_module = _lower_mlir_module(verbose, output_type, mlir_module)
+    if cache is not None:
+        cache.put(cache_key, mlir_module)
+    return mlir_module
 
 
 class TorchDynamoTestConfig(TestConfig):
@@ -121,6 +140,9 @@ class TorchDynamoTestConfig(TestConfig):
     def __init__(self, backend):
         super().__init__()
         self.backend = backend
+        # Trace items that call the same method with inputs of the same
+        # shapes produce identical graphs, which only need to be lowered once.
+        self.cache = InMemoryCompileCache()
 
     def compile(self, program: torch.nn.Module) -> torch.nn.Module:
         return program
@@ -130,7 +152,8 @@ class TorchDynamoTestConfig(TestConfig):
         for item in trace:
             module = jit(artifact,
                          item.inputs,
-                         output_type="linalg-on-tensors")
+                         output_type="linalg-on-tensors",
+                         cache=self.cache)
             module = self.backend.compile(module)
             backend_module = self.backend.load(module)
             params = {
@@ -139,11 +162,11 @@ class TorchDynamoTestConfig(TestConfig):
             }
             params_flat, params_spec = pytree.tree_flatten(params)
             params_flat = list(params_flat)
-            with torch.no_grad():
-                numpy_inputs = recursively_convert_to_numpy(params_flat +
-                                                            item.inputs)
+            # The backend reads the tensors' buffers directly, so there is no
+            # need to convert them to numpy first.
             outputs = getattr(backend_module,
-                              artifact.__class__.__name__)(*numpy_inputs)
+                              artifact.__class__.__name__)(*params_flat,
+                                                           *item.inputs)
             output = refine_result_type(outputs)
             result.append(
                 TraceItem(symbol=item.symbol,
@@ -10,7 +10,10 @@ import torch_mlir
 
 from torch_mlir_e2e_test.tosa_backends.abc import TosaBackend
 from torch_mlir_e2e_test.framework import TestConfig, Trace, TraceItem
-from torch_mlir_e2e_test.utils import convert_annotations_to_placeholders
+from torch_mlir_e2e_test.utils import (
+    convert_annotations_to_placeholders,
+    roundtrip_through_bytecode,
+)
 from .utils import (
     recursively_convert_to_numpy,
     recursively_convert_from_numpy,
@@ -23,15 +26,18 @@ class TosaBackendTestConfig(TestConfig):
     This class handles all the common lowering that torch-mlir does before
     reaching the linalg-on-tensors abstraction level.
     """
-    def __init__(self, backend: TosaBackend):
+    def __init__(self, backend: TosaBackend, roundtrip_bytecode: bool = False):
         super().__init__()
         self.backend = backend
+        self.roundtrip_bytecode = roundtrip_bytecode
 
     def compile(self, program: torch.nn.Module) -> Any:
         example_args = convert_annotations_to_placeholders(program.forward)
         module = torch_mlir.compile(
             program, example_args, output_type="tosa")
 
+        if self.roundtrip_bytecode:
+            module = roundtrip_through_bytecode(module)
         return self.backend.compile(module)
 
 
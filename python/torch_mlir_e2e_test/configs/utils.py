@@ -30,6 +30,9 @@ def recursively_convert_to_numpy(o: Any):
 def recursively_convert_from_numpy(o: Any):
     if isinstance(o, np.ndarray):
         return torch.from_numpy(o)
+    # Backends return tensors for dtypes that numpy cannot represent.
+    if isinstance(o, torch.Tensor):
+        return o
     if isinstance(o, tuple):
         return tuple(recursively_convert_from_numpy(x) for x in o)
     if isinstance(o, list):
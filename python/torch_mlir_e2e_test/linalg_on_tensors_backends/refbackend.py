@@ -4,40 +4,73 @@
 # Also available under a BSD-style license. See LICENSE.
 
 import ctypes
+import functools
+import hashlib
+import os
+import tempfile
+import threading
+from typing import Optional
+
 import numpy as np
+import torch
 
 from torch_mlir.ir import *
 from torch_mlir.passmanager import *
 from torch_mlir.execution_engine import *
 from torch_mlir.runtime import *
+import torch_mlir._mlir_libs
 import torch_mlir.dialects.torch
 from torch_mlir.compiler_utils import run_pipeline_with_repro_report
 
 from .abc import LinalgOnTensorsBackend
 
 __all__ = [
+    "RefBackendFunction",
     "RefBackendLinalgOnTensorsBackend",
+    "externalize_constants",
+    "get_lowering_pipeline",
 ]
 
 
 def assert_arg_type_is_supported(ty):
     SUPPORTED = [
-        np.float16, np.float32, np.float64, np.uint8, np.int8, np.int32,
-        np.int64, np.bool_, np.complex64, np.complex128
+        np.float16, np.float32, np.float64, np.uint8, np.int8, np.int16,
+        np.int32, np.int64, np.bool_, np.complex64, np.complex128
     ]
     assert ty in SUPPORTED, f"Only numpy arrays with dtypes in {SUPPORTED} are supported, but got {ty}"
 
 
+SUPPORTED_TORCH_DTYPES = [
+    torch.float16, torch.bfloat16, torch.float32, torch.float64, torch.uint8,
+    torch.int8, torch.int16, torch.int32, torch.int64, torch.bool,
+    torch.complex64, torch.complex128
+]
+
+
+def assert_torch_arg_is_supported(arg: torch.Tensor):
+    assert arg.dtype in SUPPORTED_TORCH_DTYPES, f"Only tensors with dtypes in {SUPPORTED_TORCH_DTYPES} are supported, but got {arg.dtype}"
+    assert arg.device.type == "cpu", f"Only CPU tensors are supported, but got a tensor on {arg.device}"
+
+
 memref_type_to_np_dtype = {
     "mrf16": np.float16,
     "mrf32": np.float32,
     "mrf64": np.float64,
     "mri1": np.bool_,
     "mri8": np.int8,
+    "mri16": np.int16,
     "mri32": np.int32,
     "mri64": np.int64,
     "mrc32": np.complex64,
-    "mrc64": np.complex128
+    "mrc64": np.complex128,
+    # numpy has no bfloat16, so the buffer is viewed as raw 16-bit values
+    # and handed over as a torch tensor, see `memref_type_to_torch_dtype`.
+    "mrbf16": np.uint16,
+}
+# The memref types whose results are always returned as torch tensors of the
+# given dtype, since numpy cannot represent them.
+memref_type_to_torch_dtype = {
+    "mrbf16": torch.bfloat16,
 }
 elemental_type_to_ctype = {
     "i1": ctypes.c_bool,
@@ -78,108 +111,566 @@ def get_ctype_func(func_name):
     return ctypes.CFUNCTYPE(*ctypes_arg), ret_types
 
 
-class RefBackendInvoker:
+EXTERNAL_CONSTANTS_ATTR = "refback.external_constants"
+
+
+def _write_external_constant(array: np.ndarray, parameters_dir: str) -> str:
+    """Writes `array` to `parameters_dir` and returns the file name.
+
+    Files are named after their contents, so constants shared by several
+    modules are only stored once.
+    """
+    hasher = hashlib.sha256()
+    hasher.update(f"{array.dtype.str}:{list(array.shape)}".encode())
+    hasher.update(np.ascontiguousarray(array).data)
+    file_name = hasher.hexdigest() + ".npy"
+    path = os.path.join(parameters_dir, file_name)
+    if not os.path.exists(path):
+        fd, tmp_path = tempfile.mkstemp(dir=parameters_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    return file_name
+
+
+def externalize_constants(module: Module,
+                          parameters_dir: str,
+                          min_elements: int = 1024):
+    """Moves the large constants of `module` into files in `parameters_dir`.
+
+    Each externalized constant becomes a trailing argument of the public
+    functions using it and is stored as a `.npy` file. The module records
+    which files to pass for which function, so a `RefBackendInvoker` created
+    with the same `parameters_dir` supplies them when the functions are
+    invoked. Files are content-addressed, so several modules compiled from
+    the same weights share them.
+
+    Args:
+      module: A module in linalg-on-tensors form. It is modified in place.
+      parameters_dir: The directory to write the constants to. It is created
+        if it does not exist.
+      min_elements: Only constants with at least this many elements are
+        externalized.
+    """
+    os.makedirs(parameters_dir, exist_ok=True)
+    pipeline = ("builtin.module(refback-externalize-constants"
+                f"{{min-elements={min_elements}}})")
+    run_pipeline_with_repro_report(module, pipeline,
+                                   "Externalizing constants with RefBackend")
+    external_constants = {}
+    for func in module.body.operations:
+        if EXTERNAL_CONSTANTS_ATTR not in func.attributes:
+            continue
+        file_names = [
+            StringAttr.get(
+                _write_external_constant(
+                    np.array(DenseElementsAttr(value), copy=False),
+                    parameters_dir))
+            for value in ArrayAttr(func.attributes[EXTERNAL_CONSTANTS_ATTR])
+        ]
+        del func.attributes[EXTERNAL_CONSTANTS_ATTR]
+        func_name = StringAttr(func.attributes["sym_name"]).value
+        external_constants[func_name] = ArrayAttr.get(file_names)
+    if external_constants:
+        module.operation.attributes[EXTERNAL_CONSTANTS_ATTR] = DictAttr.get(
+            external_constants)
+
+
+def _load_external_constants(module, parameters_dir: Optional[str]):
+    """Maps the external constants of `module`'s functions into memory."""
+    if EXTERNAL_CONSTANTS_ATTR not in module.operation.attributes:
+        return {}
+    assert parameters_dir is not None, \
+        "The module has external constants, but no parameters_dir was given"
+    arrays = {}
+    external_constants = {}
+    attr = DictAttr(module.operation.attributes[EXTERNAL_CONSTANTS_ATTR])
+    for i in range(len(attr)):
+        named_attr = attr[i]
+        file_names = [
+            StringAttr(a).value for a in ArrayAttr(named_attr.attr)
+        ]
+        for file_name in file_names:
+            if file_name not in arrays:
+                # Copy-on-write mappings are only backed by memory once
+                # written to, and never modify the file.
+                arrays[file_name] = np.load(
+                    os.path.join(parameters_dir, file_name), mmap_mode="c")
+        external_constants[named_attr.name] = [arrays[f] for f in file_names]
+    return external_constants
+
+
+@functools.lru_cache(maxsize=None)
+def _get_memref_descriptor_type(rank: int):
+    """Gets a ctypes type for a ranked memref descriptor viewed as words.
+
+    A ranked memref descriptor is laid out as `allocated, aligned, offset,
+    sizes[rank], strides[rank]`, all of which are 64-bit words on the
+    platforms supported by RefBackend. Filling the descriptor as a single
+    array of words is much cheaper than setting its fields one by one.
+    """
+    return ctypes.c_longlong * (3 + 2 * rank)
+
+
+def _get_free_function():
+    """Gets the C library's `free`, which releases what compiled code mallocs.
+
+    Returns None if it cannot be found, in which case result buffers are
+    never freed.
+    """
+    try:
+        free = ctypes.CDLL(None).free
+    except (OSError, AttributeError):
+        return None
+    free.argtypes = [ctypes.c_void_p]
+    free.restype = None
+    return free
+
+
+_free = _get_free_function()
+
+# The allocated pointer that `memref.get_global` gives to memrefs of globals,
+# which must never be freed.
+_GLOBAL_MEMREF_ALLOCATED_POINTER = 0xdeadbeef
+
+
+class _MemRefAllocation:
+    """A buffer allocated by compiled code, owned by the results viewing it.
+
+    The buffer is freed once the last array viewing it is garbage collected.
+    """
+
+    def __init__(self, allocated: int):
+        self.allocated = allocated
+        # Module globals might already be gone when this is collected at
+        # interpreter shutdown.
+        self._free = _free
+
+    def __del__(self):
+        self._free(self.allocated)
+
+
+class _ArrayInterface:
+    """Exposes a strided buffer to numpy through `__array_interface__`.
+
+    Arrays created from this keep it alive, and with it `owner`.
+    """
+
+    def __init__(self, data: int, shape, strides, dtype: np.dtype, owner):
+        self.__array_interface__ = {
+            "version": 3,
+            "data": (data, False),
+            "shape": tuple(shape),
+            "strides": tuple(strides),
+            "typestr": dtype.str,
+        }
+        self.owner = owner
+
+
+def _read_memref_descriptor(unranked_memref):
+    """Copies the ranked descriptor of `unranked_memref` into a list of words.
+
+    The descriptor only lives for the duration of the call that produced it,
+    but the buffer it describes outlives it.
+    """
+    rank = unranked_memref[0].rank
+    return _get_memref_descriptor_type(rank).from_address(
+        unranked_memref[0].descriptor)[:]
+
+
+def _memref_to_numpy(words, dtype: np.dtype, owner) -> np.ndarray:
+    """Views the memref described by `words` as a numpy array, without copying.
+    """
+    rank = (len(words) - 3) // 2
+    itemsize = dtype.itemsize
+    data = words[1] + words[2] * itemsize
+    shape = words[3:3 + rank]
+    strides = [s * itemsize for s in words[3 + rank:]]
+    return np.asarray(_ArrayInterface(data, shape, strides, dtype, owner))
+
 
-    def __init__(self, module):
-        self.ee = ExecutionEngine(module)
-        self.result = None
+class _PreparedArgument:
+    """The ctypes state used to pass one argument to a function.
+
+    The descriptors are allocated once and refilled on every call.
+    """
+
+    def __init__(self):
+        self.allocated = None
+        # The array or tensor the descriptors point into, which is kept alive
+        # until the next call.
+        self.buffer = None
+        self.unranked = UnrankedMemRefDescriptor()
+        # `ExecutionEngine` functions take a pointer to a pointer to the
+        # unranked descriptor for each argument.
+        self.pointer = ctypes.pointer(self.unranked)
+        self._descriptors = {}
+
+    def set(self, arg):
+        """Points the descriptors at `arg`.
+
+        Compiled functions read their arguments as contiguous buffers, so
+        `arg` is only passed without copying it if it is contiguous.
+
+        Args:
+          arg: A numpy array, a CPU torch tensor or any object supporting the
+            DLPack protocol.
+        """
+        if isinstance(arg, np.ndarray):
+            if not arg.flags.c_contiguous:
+                arg = np.ascontiguousarray(arg)
+            rank = arg.ndim
+            key = (rank, arg.dtype)
+            descriptor = self._descriptors.get(key)
+            if descriptor is None:
+                assert_arg_type_is_supported(arg.dtype)
+                descriptor = _get_memref_descriptor_type(rank)()
+                self._descriptors[key] = descriptor
+            data = arg.ctypes.data
+            itemsize = arg.itemsize
+            descriptor[:] = (data, data, 0, *arg.shape,
+                             *[s // itemsize for s in arg.strides])
+        else:
+            if not isinstance(arg, torch.Tensor):
+                arg = torch.from_dlpack(arg)
+            rank = arg.dim()
+            # The device is part of the key so that tensors which are not on
+            # the CPU are rejected even after a CPU tensor of the same rank
+            # and dtype was passed.
+            key = (rank, arg.dtype, arg.device)
+            descriptor = self._descriptors.get(key)
+            if descriptor is None:
+                assert_torch_arg_is_supported(arg)
+                descriptor = _get_memref_descriptor_type(rank)()
+                self._descriptors[key] = descriptor
+            if not arg.is_contiguous():
+                arg = arg.contiguous()
+            # Unlike numpy, torch already expresses strides in elements.
+            data = arg.data_ptr()
+            descriptor[:] = (data, data, 0, *arg.shape, *arg.stride())
+        self.allocated = data
+        self.buffer = arg
+        self.unranked.rank = rank
+        self.unranked.descriptor = ctypes.addressof(descriptor)
+
+
+class RefBackendFunction:
+    """A function of a loaded module, prepared for repeated invocation.
+
+    The function is looked up once, and the descriptors of its arguments are
+    reused across calls, which keeps the overhead of each call low. Get
+    instances through `RefBackendInvoker.prepare`.
+
+    A function can be invoked from several threads at once. Each thread has
+    its own descriptors and receives its own results.
+
+    Results are returned without copying them. Each result owns the buffer
+    the compiled code allocated for it, which is freed once the result, and
+    every array or tensor viewing it, is gone. Results that alias an argument
+    or a constant of the module are views of it.
+
+    Arguments can be numpy arrays, CPU torch tensors, or any object
+    supporting the DLPack protocol. The buffers of contiguous arguments are
+    passed to the compiled code directly, while other arguments are copied
+    into contiguous buffers first.
+    """
+
+    def __init__(self,
+                 invoker: "RefBackendInvoker",
+                 function_name: str,
+                 return_torch_tensors: bool = False):
+        self.function_name = function_name
+        self.return_torch_tensors = return_torch_tensors
+        self._invoker = invoker
+        self._func = invoker.ee.lookup(function_name)
+        self._external_constants = tuple(
+            invoker.external_constants.get(function_name, []))
+        self._local = threading.local()
+
+    def _prepare_arguments(self, num_args: int):
+        arguments = [_PreparedArgument() for _ in range(num_args)]
+        packed_args = (ctypes.c_void_p * num_args)(
+            *[ctypes.addressof(a.pointer) for a in arguments])
+        self._local.arguments = (arguments, packed_args)
+        return arguments, packed_args
+
+    def __call__(self, *args):
+        args += self._external_constants
+        try:
+            arguments, packed_args = self._local.arguments
+        except AttributeError:
+            arguments, packed_args = self._prepare_arguments(len(args))
+        if len(args) != len(arguments):
+            arguments, packed_args = self._prepare_arguments(len(args))
+        for argument, arg in zip(arguments, args):
+            argument.set(arg)
+        # The return function runs on this thread while `self._func` runs, so
+        # it hands the result over through thread-local storage.
+        results = self._invoker._results
+        results.value = None
+        self._func(packed_args)
+        raw_results = results.value
+        assert raw_results is not None, "Invocation didn't produce a result"
+        results.value = None
+        result = self._wrap_results(raw_results, arguments)
+        return result[0] if len(result) == 1 else result
+
+    def _wrap_results(self, raw_results, arguments):
+        """Turns the results passed to the return function into arrays."""
+        # Results that alias an argument keep the argument's buffer alive,
+        # which might be a contiguous copy made for the call.
+        borrowed = {
+            argument.allocated: argument.buffer for argument in arguments
+        }
+        borrowed[_GLOBAL_MEMREF_ALLOCATED_POINTER] = None
+        # Several results can view the same buffer, which they then share.
+        allocations = {}
+        wrapped = []
+        for raw_result in raw_results:
+            if not isinstance(raw_result, tuple):
+                # Scalars are passed by value.
+                wrapped.append(raw_result)
+                continue
+            dtype, torch_dtype, words = raw_result
+            allocated = words[0]
+            if allocated in borrowed:
+                owner = borrowed[allocated]
+            elif _free is None:
+                owner = None
+            else:
+                owner = allocations.get(allocated)
+                if owner is None:
+                    owner = allocations[allocated] = _MemRefAllocation(
+                        allocated)
+            array = _memref_to_numpy(words, dtype, owner)
+            if torch_dtype is not None:
+                array = torch.from_numpy(array).view(torch_dtype)
+            elif self.return_torch_tensors:
+                array = torch.from_numpy(array)
+            wrapped.append(array)
+        return tuple(wrapped)
+
+
+_ASYNC_RUNTIME_LIBRARY_NAMES = [
+    "libmlir_async_runtime.so",
+    "libmlir_async_runtime.dylib",
+    "mlir_async_runtime.dll",
+]
+
+
+def _get_async_runtime_library() -> str:
+    """Finds the MLIR async runtime, which is installed next to the
+    Python extensions when it was built along with them."""
+    libs_dir = os.path.dirname(torch_mlir._mlir_libs.__file__)
+    for name in _ASYNC_RUNTIME_LIBRARY_NAMES:
+        path = os.path.join(libs_dir, name)
+        if os.path.exists(path):
+            return path
+    raise Exception(
+        f"RefBackend opt_level=2 requires the MLIR async runtime library, "
+        f"which was not found in {libs_dir}. Rebuild with the "
+        f"`mlir_async_runtime` target enabled, or use opt_level=1.")
+
+
+class RefBackendInvoker:
+    """Invokes the functions of a module compiled by RefBackend.
+
+    Functions are invoked as attributes of the invoker, as in
+    `invoker.forward(*args)`. A single invoker can serve invocations from
+    many threads concurrently.
+    """
+
+    def __init__(self,
+                 module,
+                 parameters_dir: Optional[str] = None,
+                 opt_level: int = 0):
+        self.external_constants = _load_external_constants(
+            module, parameters_dir)
+        if opt_level == 0:
+            self.ee = ExecutionEngine(module)
+        else:
+            shared_libs = []
+            if opt_level >= 2:
+                shared_libs.append(_get_async_runtime_library())
+            self.ee = ExecutionEngine(module, opt_level=3,
+                                      shared_libs=shared_libs)
+        self._results = threading.local()
+        self._functions = {}
 
         return_funcs = get_return_funcs(module)
 
         for ret_func in return_funcs:
             ctype_wrapper, ret_types = get_ctype_func(ret_func)
+            self.ee.register_runtime(
+                ret_func,
+                ctype_wrapper(self._make_consume_return_func(ret_types)))
+
+    def _make_consume_return_func(self, ret_types):
+        converters = [
+            None if type in elemental_type_to_ctype else
+            (np.dtype(memref_type_to_np_dtype[type]),
+             memref_type_to_torch_dtype.get(type)) for type in ret_types
+        ]
+
+        def consume_return_func(*args):
+            # Only copy the descriptors out here; the results are built once
+            # the invocation returns.
+            self._results.value = [
+                arg if converter is None else
+                (*converter, _read_memref_descriptor(arg))
+                for arg, converter in zip(args, converters)
+            ]
+
+        return consume_return_func
+
+    def prepare(self,
+                function_name: str,
+                return_torch_tensors: bool = False) -> RefBackendFunction:
+        """Gets the function named `function_name`, ready to be invoked.
 
-            def consume_return_funcs(*args):
-                self.result = tuple([
-                    arg if type in elemental_type_to_ctype
-                    else unranked_memref_to_numpy(
-                        arg, memref_type_to_np_dtype[type])
-                    for arg, type in zip(args, ret_types)
-                ])
-                if len(self.result) == 1:
-                    self.result = self.result[0]
-
-            self.ee.register_runtime(ret_func,
-                                     ctype_wrapper(consume_return_funcs))
+        Args:
+          function_name: The name of the function.
+          return_torch_tensors: Whether the function returns torch tensors
+            instead of numpy arrays. Either way, results are not copied.
+            bfloat16 results are always returned as torch tensors, since
+            numpy cannot represent them.
+        """
+        key = (function_name, return_torch_tensors)
+        function = self._functions.get(key)
+        if function is None:
+            # Threads racing to prepare the same function all end up using
+            # the first one stored.
+            function = self._functions.setdefault(
+                key,
+                RefBackendFunction(self, function_name, return_torch_tensors))
+        return function
 
     def __getattr__(self, function_name: str):
-
-        def invoke(*args):
-            ffi_args = []
-            for arg in args:
-                assert_arg_type_is_supported(arg.dtype)
-                ffi_args.append(
-                    ctypes.pointer(
-                        ctypes.pointer(get_unranked_memref_descriptor(arg))))
-
-            self.ee.invoke(function_name, *ffi_args)
-            result = self.result
-            assert result is not None, "Invocation didn't produce a result"
-            self.result = None
-            return result
-
-        return invoke
-
-
-LOWERING_PIPELINE = "builtin.module(" + ",".join([
-    "func.func(refback-generalize-tensor-pad)",
-    # Apply some optimizations. It would be great if MLIR had more useful
-    # optimizations that worked out of the box here.
-    # Note: When measured, this doesn't seem to actually help that much
-    # for the linalg-on-tensors backend.
-    # This is likely because if things are naturally fusable we usually already
-    # emit things in that form from the high level (e.g. single linalg-generic).
-    # Other backends are likely to benefit more.
-    "func.func(linalg-fuse-elementwise-ops)",
-    "convert-shape-to-std",
-    # Bufferize.
-    "func.func(scf-bufferize)",
-    "func.func(tm-tensor-bufferize)",
-    "func.func(empty-tensor-to-alloc-tensor)",
-    "func.func(linalg-bufferize)",
-    "func-bufferize",
-    "arith-bufferize",
-    "refback-mlprogram-bufferize",
-    "func.func(tensor-bufferize)",
-    "func.func(finalizing-bufferize)",
-    "func.func(buffer-deallocation)",
-    # Munge to make it ExecutionEngine compatible.
-    # Specifically, we rewrite calling convention boundaries to be in terms
-    # of unranked memref, and we rewrite the return to actually be a
-    # callback that consumes the return (the final munged function always
-    # returns void at the C level -- we get the return value by providing the
-    # callback).
-    "refback-munge-calling-conventions",
-    # Insert global variable and instruction sequence for getting the next
-    # global seed used in stateful rng.
-    # Lower to LLVM
-    "func.func(tm-tensor-to-loops)",
-    "func.func(refback-munge-memref-copy)",
-    "func.func(convert-linalg-to-loops)",
-    "func.func(lower-affine)",
-    "convert-scf-to-cf",
-    "func.func(refback-expand-ops-for-llvm)",
-    "func.func(arith-expand)",
-    "func.func(convert-math-to-llvm)",
-    # Handle some complex mlir::math ops (e.g. atan2)
-    "convert-math-to-libm",
-    "convert-linalg-to-llvm",
-    "expand-strided-metadata",
-    "finalize-memref-to-llvm",
-    "lower-affine",
-    "func.func(convert-arith-to-llvm)",
-    "convert-func-to-llvm",
-    "convert-cf-to-llvm",
-    "convert-complex-to-llvm",
-    "reconcile-unrealized-casts",
-]) + ")"
+        # Only called for names that are not regular attributes.
+        if function_name.startswith("_"):
+            raise AttributeError(function_name)
+        try:
+            return self.prepare(function_name)
+        except RuntimeError as e:
+            raise AttributeError(function_name) from e
+
+
+def get_lowering_pipeline(opt_level: int = 0) -> str:
+    """Returns the pass pipeline lowering linalg-on-tensors IR to LLVM.
+
+    Args:
+      opt_level: 0 lowers linalg ops straight to scalar loops. 1 lowers them
+        to parallel loops, tiled for locality, and compiles the module with
+        LLVM's loop and SLP vectorizers. 2 additionally runs the parallel
+        loops on the multithreaded MLIR async runtime.
+    """
+    if opt_level == 0:
+        lower_linalg = ["func.func(convert-linalg-to-loops)"]
+    elif opt_level == 1:
+        lower_linalg = [
+            "func.func(convert-linalg-to-parallel-loops)",
+            "func.func(scf-parallel-loop-tiling{parallel-loop-tile-sizes=32,32})",
+        ]
+    else:
+        # `async-parallel-for` splits each parallel loop into blocks itself,
+        # one or more per worker, so the loops are not tiled beforehand.
+        lower_linalg = [
+            "func.func(convert-linalg-to-parallel-loops)",
+            f"async-parallel-for{{num-workers={os.cpu_count() or 1}}}",
+            "async-to-async-runtime",
+            "async-runtime-ref-counting",
+            "async-runtime-ref-counting-opt",
+            "convert-async-to-llvm",
+        ]
+    return "builtin.module(" + ",".join([
+        "func.func(refback-generalize-tensor-pad)",
+        # Apply some optimizations. It would be great if MLIR had more useful
+        # optimizations that worked out of the box here.
+        # Note: When measured, this doesn't seem to actually help that much
+        # for the linalg-on-tensors backend.
+        # This is likely because if things are naturally fusable we usually already
+        # emit things in that form from the high level (e.g. single linalg-generic).
+        # Other backends are likely to benefit more.
+        "func.func(linalg-fuse-elementwise-ops)",
+        "convert-shape-to-std",
+        # Bufferize.
+        "func.func(scf-bufferize)",
+        "func.func(tm-tensor-bufferize)",
+        "func.func(empty-tensor-to-alloc-tensor)",
+        "func.func(linalg-bufferize)",
+        "func-bufferize",
+        "arith-bufferize",
+        "refback-mlprogram-bufferize",
+        "func.func(tensor-bufferize)",
+        "func.func(finalizing-bufferize)",
+        "func.func(buffer-deallocation)",
+        # Munge to make it ExecutionEngine compatible.
+        # Specifically, we rewrite calling convention boundaries to be in terms
+        # of unranked memref, and we rewrite the return to actually be a
+        # callback that consumes the return (the final munged function always
+        # returns void at the C level -- we get the return value by providing the
+        # callback).
+        "refback-munge-calling-conventions",
+        # Insert global variable and instruction sequence for getting the next
+        # global seed used in stateful rng.
+        # Lower to LLVM
+        "func.func(tm-tensor-to-loops)",
+        "func.func(refback-munge-memref-copy)",
+        *lower_linalg,
+        "func.func(lower-affine)",
+        "convert-scf-to-cf",
+        "func.func(refback-expand-ops-for-llvm)",
+        "func.func(arith-expand)",
+        "func.func(convert-math-to-llvm)",
+        # Handle some complex mlir::math ops (e.g. atan2)
+        "convert-math-to-libm",
+        "convert-linalg-to-llvm",
+        "expand-strided-metadata",
+        "finalize-memref-to-llvm",
+        "lower-affine",
+        "func.func(convert-arith-to-llvm)",
+        "convert-func-to-llvm",
+        "convert-cf-to-llvm",
+        "convert-complex-to-llvm",
+        "reconcile-unrealized-casts",
+    ]) + ")"
+
+
+LOWERING_PIPELINE = get_lowering_pipeline(0)
 
 
 class RefBackendLinalgOnTensorsBackend(LinalgOnTensorsBackend):
     """Main entry-point for the reference backend."""
 
-    def __init__(self):
+    def __init__(self,
+                 parameters_dir: Optional[str] = None,
+                 min_external_elements: int = 1024,
+                 opt_level: int = 0):
+        """Create a RefBackend.
+
+        Args:
+          parameters_dir: If set, large constants are moved out of compiled
+            modules into this directory, and supplied to them when invoked.
+            See `externalize_constants`.
+          min_external_elements: Only constants with at least this many
+            elements are moved to `parameters_dir`.
+          opt_level: How much to optimize the generated code. See
+            `get_lowering_pipeline`. The default, 0, is the fastest to compile
+            and the simplest to debug.
+        """
         super().__init__()
+        if opt_level not in (0, 1, 2):
+            raise Exception(f"Unsupported RefBackend opt_level: {opt_level}")
+        if opt_level >= 2:
+            # Fail early rather than after lowering the first module.
+            _get_async_runtime_library()
+        self.parameters_dir = parameters_dir
+        self.min_external_elements = min_external_elements
+        self.opt_level = opt_level
 
     def compile(self, imported_module: Module):
         """Compiles an imported module, with a flat list of functions.
@@ -195,11 +686,14 @@ class RefBackendLinalgOnTensorsBackend(LinalgOnTensorsBackend):
           passed to `load`.
         """
 
+        if self.parameters_dir is not None:
+            externalize_constants(imported_module, self.parameters_dir,
+                                  self.min_external_elements)
         run_pipeline_with_repro_report(
-            imported_module, LOWERING_PIPELINE,
+            imported_module, get_lowering_pipeline(self.opt_level),
             "Lowering Linalg-on-Tensors IR to LLVM with RefBackend")
         return imported_module
 
     def load(self, module) -> RefBackendInvoker:
         """Loads a compiled artifact into the runtime."""
-        return RefBackendInvoker(module)
+        return RefBackendInvoker(module, self.parameters_dir, self.opt_level)
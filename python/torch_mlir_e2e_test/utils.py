@@ -3,7 +3,10 @@
 # SPDX-License-Identifier: Apache-2.0 WITH LLVM-exception
 # Also available under a BSD-style license. See LICENSE.
 
-from torch_mlir import TensorPlaceholder
+import os
+import tempfile
+
+from torch_mlir import TensorPlaceholder, save_module, load_module
 from torch_mlir_e2e_test.annotations import TORCH_MLIR_ARG_ANNOTATIONS_ATTR_NAME
 
 def convert_annotations_to_placeholders(forward_method):
@@ -20,3 +23,15 @@ def convert_annotations_to_placeholders(forward_method):
                 "Can only compile inputs annotated as having value semantics.")
         placeholders.append(TensorPlaceholder(annotation[0], annotation[1]))
     return placeholders
+
+
+def roundtrip_through_bytecode(module):
+    """Saves `module` to a bytecode file and loads it back.
+
+    This checks that compiled modules survive being shipped between hosts as
+    bytecode.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "module.mlirbc")
+        save_module(module, path)
+        return load_module(path)
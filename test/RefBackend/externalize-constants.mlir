@@ -0,0 +1,40 @@
+// RUN: torch-mlir-opt %s -refback-externalize-constants="min-elements=4" -split-input-file | FileCheck %s
+
+// CHECK-LABEL:   func.func @f(
+// CHECK-SAME:            %[[ARG0:.*]]: tensor<4xf32>,
+// CHECK-SAME:            %[[ARG1:.*]]: tensor<4xf32>) -> tensor<4xf32>
+// CHECK-SAME:            attributes {refback.external_constants = [dense<[1.000000e+00, 2.000000e+00, 3.000000e+00, 4.000000e+00]> : tensor<4xf32>]} {
+// CHECK:           %[[SUM:.*]] = arith.addf %[[ARG0]], %[[ARG1]] : tensor<4xf32>
+// CHECK:           %[[RESULT:.*]] = arith.addf %[[SUM]], %[[ARG1]] : tensor<4xf32>
+// CHECK:           return %[[RESULT]] : tensor<4xf32>
+func.func @f(%arg0: tensor<4xf32>) -> tensor<4xf32> {
+  %0 = arith.constant dense<[1.0, 2.0, 3.0, 4.0]> : tensor<4xf32>
+  %1 = arith.addf %arg0, %0 : tensor<4xf32>
+  %2 = arith.constant dense<[1.0, 2.0, 3.0, 4.0]> : tensor<4xf32>
+  %3 = arith.addf %1, %2 : tensor<4xf32>
+  return %3 : tensor<4xf32>
+}
+
+// -----
+
+// Small constants, splats and constants of private functions are kept.
+
+// CHECK-LABEL:   func.func @small_or_splat(
+// CHECK-SAME:            %[[ARG0:.*]]: tensor<4xi64>) -> tensor<4xi64> {
+// CHECK:           arith.constant dense<[1, 2]> : tensor<2xi64>
+// CHECK:           arith.constant dense<7> : tensor<4xi64>
+func.func @small_or_splat(%arg0: tensor<4xi64>) -> tensor<4xi64> {
+  %0 = arith.constant dense<[1, 2]> : tensor<2xi64>
+  %1 = arith.constant dense<7> : tensor<4xi64>
+  %2 = arith.addi %arg0, %1 : tensor<4xi64>
+  return %2 : tensor<4xi64>
+}
+
+// CHECK-LABEL:   func.func private @private(
+// CHECK-SAME:            %[[ARG0:.*]]: tensor<4xi64>) -> tensor<4xi64> {
+// CHECK:           arith.constant dense<[1, 2, 3, 4]> : tensor<4xi64>
+func.func private @private(%arg0: tensor<4xi64>) -> tensor<4xi64> {
+  %0 = arith.constant dense<[1, 2, 3, 4]> : tensor<4xi64>
+  %1 = arith.addi %arg0, %0 : tensor<4xi64>
+  return %1 : tensor<4xi64>
+}
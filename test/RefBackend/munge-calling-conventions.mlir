@@ -73,6 +73,16 @@ func.func @two_return_values(%arg0: memref<?xf32>, %arg1: memref<?xi64>) -> (mem
 
 // -----
 
+// CHECK-LABEL:   func.func @bf16_and_i16(
+// CHECK-SAME:                            %[[ARG0:.*]]: memref<*xbf16>, %[[ARG1:.*]]: memref<*xi16>)
+// CHECK:           call @refbackend_consume_func_return_mrbf16_mri16(
+// CHECK-SAME:          : (memref<*xbf16>, memref<*xi16>) -> ()
+func.func @bf16_and_i16(%arg0: memref<?xbf16>, %arg1: memref<?xi16>) -> (memref<?xbf16>, memref<?xi16>) {
+  return %arg0, %arg1 : memref<?xbf16>, memref<?xi16>
+}
+
+// -----
+
 // expected-error-re @+1 {{argument must be a memref of {{.*}} but got 'tensor<?xf32>'}}
 func.func @f(%arg0: tensor<?xf32>) {
   return
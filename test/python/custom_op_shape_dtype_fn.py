@@ -69,3 +69,11 @@ print(module)
 # CHECK:        return %1 : !torch.vtensor<[3,4],f32>
 # CHECK:      }
 # CHECK:    }
+
+# The generated library is stored in a file named after a hash of the source
+# of the library functions, and reused by later compiles.
+library_file_name = torch_mlir._canon_extra_library(extra_library)
+print(os.path.basename(os.path.dirname(library_file_name)),
+      os.path.exists(library_file_name),
+      library_file_name == torch_mlir._canon_extra_library(extra_library))
+# CHECK: torch_mlir_extra_library True True
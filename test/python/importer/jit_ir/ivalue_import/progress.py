@@ -0,0 +1,48 @@
+# -*- Python -*-
+# This file is licensed under a pytorch-style license
+# See LICENSE.pytorch for license information.
+
+import typing
+
+import torch
+from torch_mlir.dialects.torch.importer.jit_ir import ModuleBuilder
+
+# RUN: %PYTHON %s | FileCheck %s
+
+class Submodule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.t = torch.ones(2, 3)
+
+class TestModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.s = Submodule()
+
+recursivescriptmodule = torch.jit.script(TestModule())
+
+def print_progress(progress):
+    print(progress.path, progress.slotsImported, progress.tensorBytesImported,
+          progress.elapsedSeconds >= 0)
+
+# Slots of submodules are reported before the slot holding the submodule.
+# CHECK: training 1 0 True
+# CHECK-NEXT: s.training 2 0 True
+# CHECK-NEXT: s.t 3 24 True
+# CHECK-NEXT: s 4 24 True
+mb = ModuleBuilder()
+mb.import_module(recursivescriptmodule._c, progressCallback=print_progress)
+
+class Cancelled(Exception):
+    pass
+
+def cancel_at_submodule(progress):
+    if progress.path.startswith("s."):
+        raise Cancelled()
+
+# CHECK-NEXT: cancelled
+mb = ModuleBuilder()
+try:
+    mb.import_module(recursivescriptmodule._c, progressCallback=cancel_at_submodule)
+except Cancelled:
+    print("cancelled")
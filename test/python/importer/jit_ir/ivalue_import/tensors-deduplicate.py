@@ -0,0 +1,41 @@
+# -*- Python -*-
+# This file is licensed under a pytorch-style license
+# See LICENSE.pytorch for license information.
+
+import typing
+
+import torch
+from torch_mlir.dialects.torch.importer.jit_ir import ClassAnnotator, ImportOptions, ModuleBuilder
+
+# RUN: %PYTHON %s | torch-mlir-opt | FileCheck %s
+
+mb = ModuleBuilder()
+
+class TestModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.t1 = torch.tensor([10., 20.])
+        self.t2 = torch.tensor([10., 20.])
+        self.t3 = torch.tensor([10, 20], dtype=torch.int32)
+        self.t4 = torch.tensor([10., 20.], dtype=torch.float64)
+
+# CHECK: %[[T1:.*]] = torch.vtensor.literal(dense<[1.000000e+01, 2.000000e+01]> : tensor<2xf32>) : !torch.vtensor<[2],f32>
+# CHECK: %[[T3:.*]] = torch.vtensor.literal(dense<[10, 20]> : tensor<2xsi32>) : !torch.vtensor<[2],si32>
+# CHECK: %[[T4:.*]] = torch.vtensor.literal(dense<[1.000000e+01, 2.000000e+01]> : tensor<2xf64>) : !torch.vtensor<[2],f64>
+# CHECK: torch.nn_module {
+# CHECK:   torch.slot "t1", %[[T1]]
+# CHECK:   torch.slot "t2", %[[T1]]
+# CHECK:   torch.slot "t3", %[[T3]]
+# CHECK:   torch.slot "t4", %[[T4]]
+test_module = TestModule()
+recursivescriptmodule = torch.jit.script(test_module)
+
+import_options = ImportOptions()
+import_options.assumeTensorsHaveValueSemantics = True
+import_options.deduplicateIdenticalTensors = True
+
+class_annotator = ClassAnnotator()
+
+# TODO: Automatically handle unpacking Python class RecursiveScriptModule into the underlying ScriptModule.
+mb.import_module(recursivescriptmodule._c, class_annotator, import_options)
+mb.module.operation.print()
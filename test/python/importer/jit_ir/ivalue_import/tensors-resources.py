@@ -0,0 +1,49 @@
+# -*- Python -*-
+# This file is licensed under a pytorch-style license
+# See LICENSE.pytorch for license information.
+
+import typing
+
+import torch
+from torch_mlir.dialects.torch.importer.jit_ir import ClassAnnotator, ImportOptions, ModuleBuilder
+
+# RUN: %PYTHON %s | torch-mlir-opt | FileCheck %s
+
+mb = ModuleBuilder()
+
+class TestModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        self.ones_i32 = torch.ones(1, dtype=torch.int32)
+        self.bool_ = torch.tensor([True, False, True], dtype=torch.bool)
+        self.arange = torch.nn.Parameter(torch.arange(3.0))
+
+# CHECK: %[[ARANGE:.*]] = torch.vtensor.literal(dense_resource<torch_tensor.arange> : tensor<3xf32>) : !torch.vtensor<[3],f32>
+# CHECK: %[[BOOL_:.*]] = torch.vtensor.literal(dense_resource<torch_tensor.bool_> : tensor<3xi1>) : !torch.vtensor<[3],i1>
+# CHECK: %[[ONES_I32:.*]] = torch.vtensor.literal(dense_resource<torch_tensor.ones_i32> : tensor<1xsi32>) : !torch.vtensor<[1],si32>
+# CHECK: %[[ROOT:.*]] = torch.nn_module  {
+# CHECK:   torch.slot "arange", %[[ARANGE]] : !torch.vtensor<[3],f32>
+# CHECK:   torch.slot "bool_", %[[BOOL_]] : !torch.vtensor<[3],i1>
+# CHECK:   torch.slot "ones_i32", %[[ONES_I32]] : !torch.vtensor<[1],si32>
+# CHECK: }
+# CHECK: {-#
+# CHECK:   dialect_resources: {
+# CHECK:     builtin: {
+# CHECK-DAG:   torch_tensor.arange: "0x04000000000000000000803F00000040"
+# CHECK-DAG:   torch_tensor.bool_: "0x01000000010001"
+# CHECK-DAG:   torch_tensor.ones_i32: "0x0400000001000000"
+test_module = TestModule()
+recursivescriptmodule = torch.jit.script(test_module)
+
+import_options = ImportOptions()
+import_options.assumeTensorsHaveValueSemantics = True
+import_options.importTensorsAsResources = True
+
+class_annotator = ClassAnnotator()
+
+# TODO: Automatically handle unpacking Python class RecursiveScriptModule into the underlying ScriptModule.
+mb.import_module(recursivescriptmodule._c, class_annotator, import_options)
+# The resources keep the tensors alive, so the module stays valid after the
+# model is gone.
+del test_module, recursivescriptmodule
+mb.module.operation.print()
@@ -0,0 +1,34 @@
+# -*- Python -*-
+# This file is licensed under a pytorch-style license
+# See LICENSE.pytorch for license information.
+
+import typing
+
+import torch
+from torch_mlir.dialects.torch.importer.jit_ir import ModuleBuilder
+
+# RUN: %PYTHON %s | torch-mlir-opt | FileCheck %s
+
+mb = ModuleBuilder()
+
+class TestModule(torch.nn.Module):
+    def __init__(self):
+        super().__init__()
+        # CHECK: %[[T:.*]] = torch.tensor.literal
+        # CHECK-NOT: torch.tensor.literal
+        # CHECK: torch.nn_module {
+        # CHECK:   torch.slot "t1", %[[T]]
+        # CHECK:   torch.slot "t2", %[[T]]
+        # CHECK:   torch.slot "t3", %[[T]]
+        self.t1 = torch.tensor([10., 20.])
+        # Distinct tensors viewing exactly the same elements, such as tied
+        # weights, are imported as one literal.
+        self.t2 = self.t1.view(2)
+        self.t3 = torch.nn.Parameter(self.t1)
+
+
+test_module = TestModule()
+recursivescriptmodule = torch.jit.script(test_module)
+# TODO: Automatically handle unpacking Python class RecursiveScriptModule into the underlying ScriptModule.
+mb.import_module(recursivescriptmodule._c)
+mb.module.operation.print()